@@ -0,0 +1,57 @@
+# Transformer benchmarks
+# Released under CC0.
+# Summary: https://creativecommons.org/publicdomain/zero/1.0/
+# Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
+
+
+import time
+import tracemalloc
+
+import numpy as np
+
+import pandas as pd
+from pyscripts.henshin import DataFrameUnion, PdTransform, SelectColumns
+
+
+def measure(fn):
+    """
+    Wall time (s) and peak traced memory (MB) of `fn()`, from separate
+    runs so tracing does not skew the timing.
+    """
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dt, peak / 2**20
+
+
+def bench_union(n_rows=500_000, n_groups=20, n_cols=5, n_jobs=4):
+    """
+    `DataFrameUnion` serial vs pooled, through to the model-ready ndarray.
+    """
+    df = pd.DataFrame(
+        np.random.default_rng(0).random((n_rows, n_groups * n_cols)),
+        columns=[f'c{i}' for i in range(n_groups * n_cols)])
+    groups = np.array_split(df.columns, n_groups)
+
+    def make(**kw):
+        return DataFrameUnion([
+            SelectColumns(list(g)) if i % 2 else
+            PdTransform(lambda X, g=list(g): np.exp(np.sqrt(X[g])))
+            for i, g in enumerate(groups)
+        ], **kw).fit(df)
+
+    rows = []
+    for name, kw in [('serial', {}),
+                     ('thread', {'n_jobs': n_jobs, 'backend': 'thread'})]:
+        union = make(**kw)
+        dt, peak = measure(lambda: union.transform(df).to_numpy())
+        rows += [(name, dt, peak)]
+    return pd.DataFrame(rows, columns=['mode', 'seconds', 'peak_mb'])
+
+
+if __name__ == '__main__':
+    print(bench_union())
@@ -0,0 +1,53 @@
+# Random sampling benchmarks
+# Released under CC0.
+# Summary: https://creativecommons.org/publicdomain/zero/1.0/
+# Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
+
+
+import random
+import time
+
+import pandas as pd
+from pyscripts import rng
+
+WORDS = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf',
+         'hotel', 'india', 'juliett', 'kilo', 'lima', 'mike', 'november']
+
+
+def rows_per_sec(fn, n):
+    t0 = time.perf_counter()
+    fn(n)
+    return n / (time.perf_counter() - t0)
+
+
+def python_strings(n, length=8, alphabet='abcdefghijklmnopqrstuvwxyz'):
+    return [''.join(random.choices(alphabet, k=length)) for _ in range(n)]
+
+
+def python_text(n, n_words=3):
+    return [' '.join(random.choices(WORDS, k=n_words)) for _ in range(n)]
+
+
+def bench_strings(n=5_000_000):
+    """
+    Rows per second, vectorized vs. per-row Python.
+    """
+    cases = [
+        ('r_strings U8', lambda n: rng.r_strings(n, 8)),
+        ('r_strings S(4,12) fmt', lambda n: rng.r_strings(
+            n, (4, 12), fmt='id-{}', output='S')),
+        ('r_text 1 word category', lambda n: rng.r_text(
+            n, WORDS, output='category')),
+        ('r_text 3 words U', lambda n: rng.r_text(n, WORDS, 3)),
+        ('python strings', python_strings),
+        ('python text', python_text),
+    ]
+    rows = []
+    for name, fn in cases:
+        m = n if not name.startswith('python') else n // 10
+        rows += [(name, rows_per_sec(fn, m))]
+    return pd.DataFrame(rows, columns=['case', 'rows_per_sec'])
+
+
+if __name__ == '__main__':
+    print(bench_strings().to_string(float_format='{:,.0f}'.format))
@@ -0,0 +1,102 @@
+# Read and write benchmarks
+# Released under CC0.
+# Summary: https://creativecommons.org/publicdomain/zero/1.0/
+# Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
+
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import pandas as pd
+from pyscripts import rng
+from pyscripts.scholar import iter_lines, read_file, write_arr
+
+
+def measure(fn):
+    """
+    Wall time (s) and peak traced memory (MB) of `fn()`, from separate
+    runs so tracing does not skew the timing.
+    """
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dt, peak / 2**20
+
+
+def make_log(path, n_lines):
+    levels = ['INFO', 'INFO', 'INFO', 'WARN', 'ERROR']
+    lines = rng.r_text(n_lines, levels, fmt='2024-01-01 {} ')
+    msgs = rng.r_strings(n_lines, (20, 80))
+    with open(path, 'w') as file:
+        for a, b in zip(lines, msgs):
+            file.write(a + b + '\n')
+
+
+def consume(it):
+    n = 0
+    for x in it:
+        n += 1
+    return n
+
+
+def bench_read(n_lines=2_000_000):
+    """
+    `read_file` vs. `iter_lines`, wall time and peak memory.
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'log.txt')
+    make_log(path, n_lines)
+    cases = [
+        ('read_file', lambda: read_file(path)),
+        ('read_file filter', lambda: read_file(
+            path, line_filter=lambda x: 'ERROR' in x)),
+        ('iter_lines', lambda: consume(iter_lines(path))),
+        ('iter_lines filter', lambda: consume(
+            iter_lines(path, line_filter='ERROR'))),
+        ('iter_lines S', lambda: consume(iter_lines(path, output='S'))),
+        ('iter_lines offsets', lambda: consume(
+            iter_lines(path, output='offsets'))),
+    ]
+    rows = [(name, *measure(fn)) for name, fn in cases]
+    size = os.path.getsize(path) / 2**20
+    os.remove(path)
+    out = pd.DataFrame(rows, columns=['case', 'seconds', 'peak_mb'])
+    out['file_mb'] = round(size)
+    return out
+
+
+def bench_write_arr(n_rows=1_000_000, n_cols=5):
+    """
+    `write_arr` vs. `np.savetxt` vs. a per-row Python loop.
+    """
+    arr = np.random.default_rng(0).random((n_rows, n_cols))
+    path = os.path.join(tempfile.mkdtemp(), 'arr.txt')
+
+    def loop():
+        with open(path, 'w') as file:
+            for row in arr:
+                file.write(' '.join(f'{x:.6f}' for x in row) + '\n')
+
+    cases = [
+        ('write_arr %.6f', lambda: write_arr(arr, path, fmt='%.6f')),
+        ('write_arr default', lambda: write_arr(arr, path)),
+        ('np.savetxt %.6f', lambda: np.savetxt(path, arr, fmt='%.6f')),
+        ('python loop %.6f', loop),
+    ]
+    rows = [(name, *measure(fn)) for name, fn in cases]
+    os.remove(path)
+    out = pd.DataFrame(rows, columns=['case', 'seconds', 'peak_mb'])
+    out['rows_per_sec'] = (n_rows / out['seconds']).round()
+    return out
+
+
+if __name__ == '__main__':
+    print(bench_read())
+    print(bench_write_arr())
@@ -4,50 +4,338 @@
 # Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
 
 
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Iterator
+
 import numpy as np
 
 import pandas as pd
+from scipy import sparse
+from pyscripts.scholar import read, write
 from sklearn.base import TransformerMixin
 
+CACHE_PREFIX = 'ct-'
+WORKER_DATA = None
+
+
+class CachedTransform(TransformerMixin):
+    """
+    Cache `trf.transform` results, keyed on a content hash of the input
+    plus the pickled state of `trf` (or, if it can't be pickled, its
+    identity and the no. of fits made through this wrapper).
+
+    Results live in memory (LRU, `maxsize` entries) or, with `cache_dir`,
+    on disk as `ct-<key>.pkl` files (least recently used evicted above
+    `max_bytes`; other files are left alone). `sample=k` hashes every
+    k-th row only. Counts are in `hits` and `misses`. In-place
+    transformers (`inplace=True`) are refused, since a hit would leave
+    `X` unchanged where a miss mutates it.
+    """
+    def __init__(self, trf, maxsize=32, cache_dir=None, max_bytes=None,
+                 sample=None):
+        if getattr(trf, 'inplace', False):
+            raise ValueError('Cannot cache an in-place transformer')
+        self.trf = trf
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.sample = sample
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.n_fits = 0
+
+    def fit(self, X, y=None):
+        self.trf.fit(X, y)
+        self.n_fits += 1
+        return self
+
+    def partial_fit(self, X, y=None):
+        self.trf.partial_fit(X, y)
+        self.n_fits += 1
+        return self
+
+    def transform(self, X):
+        key = fingerprint(X, self.sample) + param_hash(self.trf, self.n_fits)
+        out = self.get(key)
+        if out is None:
+            self.misses += 1
+            out = self.trf.transform(X)
+            self.put(key, out)
+        else:
+            self.hits += 1
+        if isinstance(out, (pd.DataFrame, pd.Series)):
+            return out.copy(deep=False)
+        return out
+
+    def get(self, key):
+        if self.cache_dir is None:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            return None
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return read(path)
+
+    def put(self, key, out):
+        if self.cache_dir is None:
+            self.cache[key] = out
+            while len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write(out, self.path(key))
+        if self.max_bytes is None:
+            return
+        entries = sorted(self.entries(), key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        for e in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= e.stat().st_size
+            os.remove(e.path)
+
+    def clear(self):
+        """
+        Drop cached results, in memory and on disk, and reset counts.
+        """
+        self.cache.clear()
+        for e in self.entries():
+            os.remove(e.path)
+        self.hits = self.misses = 0
+
+    def entries(self):
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return []
+        return [e for e in os.scandir(self.cache_dir)
+                if e.is_file() and e.name.startswith(CACHE_PREFIX)
+                and e.name.endswith('.pkl')]
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f'{CACHE_PREFIX}{key}.pkl')
+
 
 class DataFrameUnion(TransformerMixin):
-    def __init__(self, trf_list):
+    """
+    Column-wise union of transformers.
+
+    `n_jobs=None` runs members serially. Otherwise members run in a
+    `backend` ('thread' or 'process') pool of `n_jobs` workers, and
+    same-dtype outputs are copied into one preallocated block.
+    """
+    def __init__(self, trf_list, n_jobs=None, backend='thread'):
         self.trf_list = trf_list
+        self.n_jobs = n_jobs
+        self.backend = backend
 
     def fit(self, X, y=None):
-        for t in self.trf_list:
-            t.fit(X, y)
+        if self.n_jobs is None:
+            for t in self.trf_list:
+                t.fit(X, y)
+        else:
+            # process workers fit copies, so keep what comes back
+            self.trf_list = self._map(fit_one, X, y)
+        return self
+
+    def partial_fit(self, X, y=None):
+        if self.n_jobs is None:
+            for t in self.trf_list:
+                t.partial_fit(X, y)
+        else:
+            self.trf_list = self._map(partial_fit_one, X, y)
         return self
 
     def transform(self, X):
-        return pd.concat([t.transform(X) for t in self.trf_list], axis=1)
+        if self.n_jobs is None:
+            return pd.concat([t.transform(X) for t in self.trf_list], axis=1)
+        return hstack(self._map(transform_one, X))
+
+    def _map(self, fn, X, y=None):
+        n = len(self.trf_list)
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        n_jobs = max(1, min(n_jobs, n))
+        if self.backend == 'thread':
+            with ThreadPoolExecutor(max_workers=n_jobs) as ex:
+                return list(ex.map(fn, self.trf_list, [X] * n, [y] * n))
+        elif self.backend == 'process':
+            # send X to each worker once, not once per member
+            with ProcessPoolExecutor(
+                    max_workers=n_jobs,
+                    initializer=set_worker_data,
+                    initargs=(X, y)) as ex:
+                return list(ex.map(call_worker, [fn] * n, self.trf_list))
+        raise ValueError(f'Unknown backend: {self.backend!r}')
 
 
 class FillNA(TransformerMixin):
-    def __init__(self, col, val):
+    """
+    Fill NA over `col` (a name, list of names, or None for all columns)
+    in one vectorized pass.
+
+    `val` is a scalar, a dict of per-column values, or one of 'mean',
+    'median', 'mode', learned in `fit` ('mean' and 'median' over numeric
+    columns only). With `inplace=True` the blocks of `X` are filled in
+    place and `X` is returned; don't share `X` with other transformers
+    running concurrently then.
+    """
+    def __init__(self, col, val, inplace=False):
         self.col = col
         self.val = val
+        self.inplace = inplace
 
     def fit(self, X, y=None):
+        if not self.learned():
+            return self
+        X = self.select(X)
+        if self.val == 'mean':
+            self.sums = X.sum(numeric_only=True)
+            self.counts = X[self.sums.index].count()
+            self.fill = (self.sums / self.counts).to_dict()
+        elif self.val == 'median':
+            self.fill = X.median(numeric_only=True).to_dict()
+        else:
+            self.freqs = {c: X[c].value_counts() for c in X}
+            self.fill = {c: f.idxmax() for c, f in self.freqs.items()
+                         if len(f)}
+        return self
+
+    def partial_fit(self, X, y=None):
+        if not self.learned() or not hasattr(self, 'fill'):
+            return self.fit(X, y)
+        X = self.select(X)
+        if self.val == 'mean':
+            sums = X.sum(numeric_only=True)
+            self.sums = self.sums.add(sums, fill_value=0)
+            self.counts = self.counts.add(
+                X[sums.index].count(), fill_value=0)
+            self.fill = (self.sums / self.counts).to_dict()
+        elif self.val == 'mode':
+            for c in X:
+                self.freqs[c] = self.freqs.get(c, pd.Series()).add(
+                    X[c].value_counts(), fill_value=0)
+            self.fill = {c: f.idxmax() for c, f in self.freqs.items()
+                         if len(f)}
+        else:
+            raise ValueError('median cannot be fitted incrementally')
         return self
 
     def transform(self, X):
-        X[self.col].fillna(self.val, inplace=True)
-        return X
+        if self.learned():
+            fill = self.fill
+        elif isinstance(self.val, dict) or self.col is None:
+            fill = self.val
+        else:
+            fill = {c: self.val for c in self.names()}
+        if self.inplace:
+            X.fillna(fill, inplace=True)
+            return X
+        return X.fillna(fill)
+
+    def learned(self):
+        return isinstance(self.val, str) \
+            and self.val in ('mean', 'median', 'mode')
+
+    def names(self):
+        if self.col is None and isinstance(self.val, dict):
+            return list(self.val)
+        if isinstance(self.col, str):
+            return [self.col]
+        return self.col
+
+    def select(self, X):
+        names = self.names()
+        return X if names is None else X[names]
 
 
 class GetDummies(TransformerMixin):
-    def __init__(self, cols=None, drop_first=False):
+    """
+    Dummies over the categories frozen in `fit`, so every batch gets the
+    same columns. Columns are encoded through category codes.
+
+    `sparse`: None (dense), 'pandas' (`SparseDtype` columns) or 'scipy'
+    (CSR matrix, columns as in the dense frame).
+    `handle_unknown`: 'ignore' encodes unseen categories as all zeros,
+    'error' raises `ValueError`.
+    """
+    def __init__(self, cols=None, drop_first=False, sparse=None,
+                 handle_unknown='ignore', dtype=np.uint8):
         self.cols = cols
         self.drop = drop_first
+        self.sparse = sparse
+        self.handle_unknown = handle_unknown
+        self.dtype = dtype
+        self.categories = {}
 
     def fit(self, X, y=None):
+        self.categories = {}
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y=None):
+        if self.cols:
+            X = X[self.cols]
+        self.categories = learn_categories(X, self.categories)
         return self
 
     def transform(self, X):
         if self.cols:
             X = X[self.cols]
-        return pd.get_dummies(X, drop_first=self.drop)
+        categories = self.categories or learn_categories(X, {})
+        cat_cols = [c for c in X.columns if c in categories]
+
+        # one (row, col) pair per hot cell, across all columns
+        n = len(X)
+        rows, cols, names = [], [], []
+        for c in cat_cols:
+            cats = categories[c]
+            codes = cats.get_indexer(X[c])
+            if self.handle_unknown == 'error':
+                unseen = (codes == -1) & X[c].notna().to_numpy()
+                if unseen.any():
+                    raise ValueError(
+                        f'Unseen categories in {c!r}: '
+                        f'{X[c][unseen].unique()[:10].tolist()}')
+            if self.drop:
+                cats = cats[1:]
+                codes = codes - 1
+            hot = np.flatnonzero(codes >= 0)
+            rows += [hot]
+            cols += [codes[hot] + len(names)]
+            names += [f'{c}_{x}' for x in cats]
+        rows = np.concatenate(rows) if rows else np.empty(0, np.intp)
+        cols = np.concatenate(cols) if cols else np.empty(0, np.intp)
+
+        other = X.drop(columns=cat_cols)
+        if self.sparse == 'scipy':
+            dummies = sparse.csr_matrix(
+                (np.ones(len(rows), self.dtype), (rows, cols)),
+                shape=(n, len(names)))
+            if other.shape[1] == 0:
+                return dummies
+            return sparse.hstack(
+                [sparse.csr_matrix(other.to_numpy()), dummies],
+                format='csr')
+        elif self.sparse == 'pandas':
+            dummies = pd.DataFrame.sparse.from_spmatrix(
+                sparse.coo_matrix(
+                    (np.ones(len(rows), self.dtype), (rows, cols)),
+                    shape=(n, len(names))),
+                index=X.index,
+                columns=names)
+        elif self.sparse is None:
+            block = np.zeros((n, len(names)), self.dtype)
+            block[rows, cols] = 1
+            dummies = pd.DataFrame(
+                block, index=X.index, columns=names, copy=False)
+        else:
+            raise ValueError(f'Unknown sparse format: {self.sparse!r}')
+        return pd.concat([other, dummies], axis=1)
 
 
 class NADummies(TransformerMixin):
@@ -57,28 +345,83 @@ class NADummies(TransformerMixin):
     def fit(self, X, y=None):
         return self
 
+    partial_fit = fit
+
     def transform(self, X):
         if isinstance(self.cols, str):
             return self.dummies(X, self.cols)
-        else:
-            ls = [self.dummies(X, c) for c in self.cols]
-            return pd.concat(ls, axis=1)
+        block = X[self.cols].isna().to_numpy().view(np.uint8)
+        return pd.DataFrame(
+            block,
+            index=X.index,
+            columns=[c + '_na' for c in self.cols],
+            copy=False)
 
     def dummies(self, X, col):
         return X[col].isna().astype(np.uint8).rename(col + '_na')
 
 
 class PdStandardScaler(TransformerMixin):
-    def __init__(self):
-        pass
+    """
+    Standardize columns, keeping float dtype (float32 stays float32).
+    Constant columns are centred but not scaled.
+
+    With `copy=False`, writable float ndarrays are scaled in place.
+    DataFrames are always copied, as copy-on-write pandas hands out
+    read-only arrays. Statistics are kept as per-column count `n`,
+    `mean` and sum of squared deviations `m2`, and can be merged across
+    shards.
+    """
+    def __init__(self, copy=True):
+        self.copy = copy
 
     def fit(self, X, y=None):
-        self.mean = X.mean()
-        self.std = X.std(ddof=0)
+        self.n, self.mean, self.m2 = moments(X)
+        self.std = np.sqrt(self.m2 / self.n)
+        return self
+
+    def partial_fit(self, X, y=None):
+        if not hasattr(self, 'n'):
+            return self.fit(X, y)
+        return self.merge_moments(*moments(X))
+
+    def merge(self, other):
+        """
+        Combine with a scaler fitted on another shard.
+        """
+        return self.merge_moments(other.n, other.mean, other.m2)
+
+    def merge_moments(self, n_b, mean_b, m2_b):
+        """
+        Chan et al. pairwise update of (count, mean, sum sq. dev.).
+        """
+        n = self.n.add(n_b, fill_value=0)
+        mean_a = self.mean.fillna(0)
+        delta = mean_b.fillna(0) - mean_a
+        self.mean = mean_a + delta * n_b / n
+        self.m2 = self.m2.fillna(0) + m2_b.fillna(0) \
+            + delta**2 * self.n * n_b / n
+        self.n = n
+        self.std = np.sqrt(self.m2 / n)
         return self
 
     def transform(self, X):
-        return (X - self.mean) / self.std
+        arr = X.to_numpy() if isinstance(X, pd.DataFrame) else np.asarray(X)
+        if not np.issubdtype(arr.dtype, np.floating):
+            arr = arr.astype(np.float64, order='K')
+        elif self.copy or not arr.flags.writeable:
+            arr = arr.copy(order='K')
+
+        mean, std = self.mean, self.std.where(self.std > 0, 1)
+        if isinstance(X, pd.DataFrame):
+            mean, std = mean.reindex(X.columns), std.reindex(X.columns)
+        arr -= mean.to_numpy(arr.dtype)
+        arr /= std.to_numpy(arr.dtype)
+
+        if isinstance(X, pd.DataFrame):
+            return pd.DataFrame(
+                arr, index=X.index, columns=X.columns, copy=False)
+        return arr
 
 
 class PdTransform(TransformerMixin):
@@ -88,6 +431,8 @@ class PdTransform(TransformerMixin):
     def fit(self, X, y=None):
         return self
 
+    partial_fit = fit
+
     def transform(self, X):
         return self.fn(X)
 
@@ -100,6 +445,8 @@ class SelectColumns(TransformerMixin):
     def fit(self, X, y=None):
         return self
 
+    partial_fit = fit
+
     def transform(self, X):
         if self.include:
             X = X[self.include]
@@ -116,5 +463,157 @@ class SelectDtypes(TransformerMixin):
     def fit(self, X, y=None):
         return self
 
+    partial_fit = fit
+
     def transform(self, X):
         return X.select_dtypes(include=self.include, exclude=self.exclude)
+
+
+#
+# Streaming
+
+def fit_chunks(
+        trf: TransformerMixin,
+        chunks: Iterable[pd.DataFrame]) \
+        -> TransformerMixin:
+    """
+    Fit `trf` incrementally, one chunk at a time.
+    """
+    for i, X in enumerate(chunks):
+        if i == 0:
+            trf.fit(X)
+        else:
+            trf.partial_fit(X)
+    return trf
+
+
+def transform_chunks(
+        trf: TransformerMixin,
+        chunks: Iterable[pd.DataFrame]) \
+        -> Iterator[pd.DataFrame]:
+    """
+    Lazily transform each chunk, e.g. `pd.read_csv(path, chunksize=n)`.
+    """
+    for X in chunks:
+        yield trf.transform(X)
+
+
+#
+# Helpers
+
+def fingerprint(
+        X,
+        sample: int = None) \
+        -> str:
+    """
+    Content hash of a frame, series or array, over its raw buffers.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(X, pd.Series):
+        X = X.to_frame()
+    if isinstance(X, pd.DataFrame):
+        h.update(pickle.dumps((X.shape, list(X.columns), list(X.dtypes))))
+        arrays = [X.index.to_numpy()] + [X[c].to_numpy() for c in X]
+    else:
+        arrays = [np.asarray(X)]
+    for a in arrays:
+        if sample:
+            a = a[::sample]
+        if a.dtype.kind == 'O':
+            a = pd.util.hash_array(a.ravel())
+        h.update(np.ascontiguousarray(a).view(np.uint8))
+    return h.hexdigest()
+
+
+def param_hash(
+        trf: TransformerMixin,
+        n_fits: int = 0) \
+        -> str:
+    """
+    Hash of transformer state, by pickle, else by identity and `n_fits`.
+    """
+    try:
+        b = pickle.dumps(trf, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        b = f'{type(trf).__qualname__}@{id(trf)}#{n_fits}'.encode()
+    return hashlib.blake2b(b, digest_size=8).hexdigest()
+
+
+def learn_categories(X, categories):
+    """
+    Merge categorical columns' categories in `X` into `categories`.
+    """
+    categories = dict(categories)
+    for c in X.select_dtypes(['object', 'category', 'string']):
+        if isinstance(X[c].dtype, pd.CategoricalDtype):
+            cats = X[c].cat.categories
+        else:
+            cats = pd.Index(X[c].dropna().unique()).sort_values()
+        if c in categories:
+            cats = categories[c].union(cats)
+        categories[c] = cats
+    return categories
+
+
+def moments(X):
+    """
+    Per-column count, mean and sum of squared deviations from the mean.
+    """
+    n = X.count()
+    mean = X.mean().astype(np.float64)
+    m2 = (X.var(ddof=0) * n).astype(np.float64)
+    return n, mean, m2
+
+
+def fit_one(t, X, y=None):
+    return t.fit(X, y)
+
+
+def partial_fit_one(t, X, y=None):
+    return t.partial_fit(X, y)
+
+
+def transform_one(t, X, y=None):
+    return t.transform(X)
+
+
+def call_worker(fn, t):
+    """
+    `fn(t, X, y)` on the data shared by `set_worker_data`.
+    """
+    return fn(t, *WORKER_DATA)
+
+
+def hstack(frames):
+    """
+    `pd.concat(frames, axis=1)`, via one preallocated block if possible.
+    """
+    frames = [f.to_frame() if isinstance(f, pd.Series) else f
+              for f in frames]
+    index = frames[0].index
+    dtypes = {dt for f in frames for dt in f.dtypes}
+    if len(dtypes) != 1 or not all(f.index.equals(index) for f in frames):
+        return pd.concat(frames, axis=1)
+
+    dtype = dtypes.pop()
+    if not isinstance(dtype, np.dtype):
+        return pd.concat(frames, axis=1)
+
+    # fortran order matches pandas' (n_cols, n_rows) block layout
+    n_cols = sum(f.shape[1] for f in frames)
+    block = np.empty((len(index), n_cols), dtype, order='F')
+    i = 0
+    for f in frames:
+        j = i + f.shape[1]
+        block[:, i:j] = f.to_numpy()
+        i = j
+    columns = frames[0].columns.append([f.columns for f in frames[1:]])
+    return pd.DataFrame(block, index=index, columns=columns, copy=False)
+
+
+def set_worker_data(X, y=None):
+    """
+    Share `X` and `y` with `call_worker` (pool initializer).
+    """
+    global WORKER_DATA
+    WORKER_DATA = X, y
@@ -6,6 +6,7 @@
 
 import re
 
+re_dice = re.compile(r'\s*([+-])?\s*(?:(\d*)d(\d+)(?:k([hl])(\d+))?|(\d+))\s*')
 re_ext = re.compile(r'.+(\.\w+)$')
 re_imports = re.compile(r'^\s*(from|import)[\s.]+(\w+)')
 re_github = re.compile(r'[htps:/]+github\.com/[\w-]+/([\w-]+)')
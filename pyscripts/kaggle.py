@@ -5,6 +5,9 @@
 
 
 import numpy as np
+import pandas as pd
+
+ORDER = [np.floating, np.integer, 'category', 'object']
 
 
 def na(X):
@@ -19,13 +22,181 @@ def perc(x, n_dec=1, dtype='float'):
     return (x*100).astype(dtype).round(n_dec)
 
 
+def profile(data, order=None, n_dec=1):
+    """
+    Summary of `data`, a frame or iterable of chunks, one row per column.
+
+    Columns are `group` (index into `order`, matched by `select_dtypes`
+    as in `reorder`), `dtype`, `na`, `na_perc`, `nunique`, `min`, `max`
+    and `memory` (bytes), in `reorder` order. Each chunk is read once
+    per dtype block.
+    Uniques are merged chunk by chunk, so `nunique` is exact and memory
+    grows with the number of uniques, not rows; numeric uniques are
+    sort based, which beats hashing. Category labels are counted once
+    in `memory`, not per chunk.
+    """
+    if isinstance(data, pd.DataFrame):
+        data = [data]
+    if order is None:
+        order = ORDER
+
+    n_rows = 0
+    stats = {}
+    for df in data:
+        if not len(df):
+            continue
+        n_rows += len(df)
+        memory = df.memory_usage(deep=True, index=False)
+        for dtype, cols in df.columns.groupby(df.dtypes).items():
+            for col, s in zip(cols, block_stats(df[cols])):
+                s['dtype'] = dtype
+                s['memory'] = memory[col] - category_memory(dtype)
+                stats[col] = merge_stats(stats[col], s) if col in stats \
+                    else s
+
+    empty = pd.DataFrame(
+        {x: pd.Series(dtype=s['dtype']) for x, s in stats.items()})
+    group, cols = [], []
+    for i, names in dtype_groups(empty, order):
+        group += [i] * len(names)
+        cols += names
+    na = np.array([stats[x]['na'] for x in cols], dtype=np.int64)
+    return pd.DataFrame({
+        'group': group,
+        'dtype': [str(stats[x]['dtype']) for x in cols],
+        'na': na,
+        'na_perc': perc(na / max(n_rows, 1), n_dec),
+        'nunique': [len(stats[x]['uniq']) for x in cols],
+        'min': [stats[x]['min'] for x in cols],
+        'max': [stats[x]['max'] for x in cols],
+        'memory': [stats[x]['memory'] + category_memory(stats[x]['dtype'])
+                   for x in cols]
+    }, index=pd.Index(cols, name='column'))
+
+
 def reorder(df, order=None):
     """
     Sort `df` columns by dtype and name.
     """
-    def sort(df):
-        return df.dtypes.reset_index().sort_values([0, 'index'])['index']
     if order is None:
-        order = [np.floating, np.integer, 'category', 'object']
-    names = [sort(df.select_dtypes(s)) for s in order]
+        order = ORDER
+    empty = df.iloc[:0]
+    names = [dtype_sort(empty.select_dtypes(s)) for s in order]
     return df[[x for ls in names for x in ls]]
+
+
+#
+# Helpers
+
+
+def block_stats(block):
+    """
+    NA count, min, max and non-null uniques of each column of a
+    one-dtype block.
+    """
+    dtype = block.dtypes.iloc[0]
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufmM':
+        X = block.to_numpy()
+        if dtype.kind == 'f':
+            na = np.isnan(X).sum(axis=0)
+        elif dtype.kind in 'mM':
+            na = np.isnat(X).sum(axis=0)
+        else:
+            na = np.zeros(X.shape[1], dtype=np.int64)
+        lo = np.fmin.reduce(X, axis=0)
+        hi = np.fmax.reduce(X, axis=0)
+        return [
+            {'na': na[j], 'min': lo[j], 'max': hi[j],
+             'uniq': sorted_unique(X[:, j])}
+            for j in range(X.shape[1])]
+
+    na = block.isna().sum().to_numpy()
+    out = []
+    for j, (_, s) in enumerate(block.items()):
+        out += [{'na': na[j], 'min': safe(s.min), 'max': safe(s.max),
+                 'uniq': np.asarray(s.dropna().unique())}]
+    return out
+
+
+def category_memory(dtype):
+    """
+    Bytes of the category labels of `dtype`, 0 for other dtypes.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        return dtype.categories.memory_usage(deep=True)
+    return 0
+
+
+def dtype_groups(df, order):
+    """
+    `(index into order, names)` per `order` entry, as `select_dtypes`
+    picks them, then unmatched columns. Each column goes to its first
+    match.
+    """
+    seen, out = set(), []
+    for i, spec in enumerate(order):
+        names = [x for x in dtype_sort(df.select_dtypes(spec))
+                 if x not in seen]
+        seen.update(names)
+        out += [(i, names)]
+    rest = [x for x in df.columns if x not in seen]
+    out += [(len(order), dtype_sort(df[rest]))]
+    return out
+
+
+def dtype_sort(df):
+    """
+    `df` column names sorted by dtype, then name.
+    """
+    try:
+        return list(
+            df.dtypes.reset_index().sort_values([0, 'index'])['index'])
+    except (TypeError, ValueError):
+        # dtypes that don't compare, e.g. category with bool
+        return sorted(df.columns, key=lambda x: (str(df[x].dtype), x))
+
+
+def merge_stats(a, b):
+    """
+    Combine `block_stats` entries of two chunks.
+    """
+    return {
+        'na': a['na'] + b['na'],
+        'min': safe(lambda: min(x for x in (a['min'], b['min'])
+                                if not pd.isna(x))),
+        'max': safe(lambda: max(x for x in (a['max'], b['max'])
+                                if not pd.isna(x))),
+        'uniq': merge_unique(a['uniq'], b['uniq']),
+        'dtype': b['dtype'],
+        'memory': a['memory'] + b['memory']
+    }
+
+
+def merge_unique(a, b):
+    """
+    Uniques of two arrays of uniques.
+    """
+    x = np.concatenate([a, b])
+    return sorted_unique(x) if x.dtype.kind in 'biufmM' else pd.unique(x)
+
+
+def sorted_unique(x):
+    """
+    Non-null uniques of 1d numeric array, sort based.
+    """
+    x = np.sort(x)
+    keep = np.empty(len(x), dtype=bool)
+    keep[:1] = True
+    np.not_equal(x[1:], x[:-1], out=keep[1:])
+    x = x[keep]
+    return x[~pd.isna(x)]
+
+
+def safe(fn):
+    """
+    `fn()`, or None if the values can't be compared.
+    """
+    try:
+        return fn()
+    except (TypeError, ValueError):
+        return None
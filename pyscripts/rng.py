@@ -4,53 +4,429 @@
 # Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
 
 
-# TODO: impl PCG rng
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from math import ceil, comb
+from string import ascii_letters, digits
+from typing import Callable, Sequence, Tuple, Union
 
+import numpy as np
 
-def bootstrap():
+import pandas as pd
+from pandas.api.extensions import ExtensionArray
+from pyscripts.hero import re_dice
+from scipy import sparse
+
+SEED = np.random.SeedSequence()
+RNG = np.random.Generator(np.random.PCG64(SEED))
+
+# array shared with bootstrap_reduce workers
+WORKER_ARR = None
+
+
+def bootstrap(
+        arr: np.ndarray,
+        n_samples: int = 1,
+        size: int = None,
+        axis: int = 0,
+        return_index: bool = False) \
+        -> np.ndarray:
     """
     Sample with replacement.
+
+    Draws all `n_samples` resamples as one index matrix, shape
+    `(n_samples, size)`, and takes along `axis` in one step.
     """
-    pass
+    arr = np.asarray(arr)
+    n = arr.shape[axis]
+    if size is None:
+        size = n
+    idx = RNG.integers(0, n, size=(n_samples, size), dtype=index_dtype(n))
+    if return_index:
+        return idx
+    return np.take(arr, idx, axis=axis)
 
 
-def shuffle():
+def bootstrap_reduce(
+        arr: np.ndarray,
+        reducer: Callable[[np.ndarray], np.ndarray],
+        n_samples: int,
+        size: int = None,
+        axis: int = 0,
+        n_jobs: int = None,
+        batch_size: int = 1000) \
+        -> np.ndarray:
+    """
+    Reduced statistics of `n_samples` resamples, across processes.
+
+    Resamples are drawn in batches of `batch_size`, each from its own
+    child stream spawned from `SEED`. `reducer` maps a batch, shape
+    `(batch, size, ...)`, to one statistic per resample; only those are
+    sent back. The result is the same for any `n_jobs`.
+    """
+    arr = np.asarray(arr)
+    if size is None:
+        size = arr.shape[axis]
+    n_batches = ceil(n_samples / batch_size)
+    batches = [min(batch_size, n_samples - i * batch_size)
+               for i in range(n_batches)]
+    streams = SEED.spawn(n_batches)
+    args = (streams, batches, [size] * n_batches,
+            [reducer] * n_batches, [axis] * n_batches)
+
+    if n_jobs is None:
+        set_worker_arr(arr)
+        try:
+            out = list(map(bootstrap_batch, *args))
+        finally:
+            set_worker_arr(None)
+    else:
+        n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        with ProcessPoolExecutor(
+                max_workers=max(1, min(n_jobs, n_batches)),
+                initializer=set_worker_arr,
+                initargs=(arr,)) as ex:
+            out = list(ex.map(bootstrap_batch, *args))
+    return np.concatenate(out)
+
+
+def shuffle(
+        arr: np.ndarray,
+        size: int = None,
+        axis: int = 0,
+        inplace: bool = False) \
+        -> np.ndarray:
     """
     Sample without replacement.
+
+    `inplace=True` permutes `arr` itself, without a copy.
     """
-    pass
+    if inplace:
+        if size is not None:
+            raise ValueError('`size` cannot be used with `inplace`')
+        RNG.shuffle(arr, axis=axis)
+        return arr
+    if size is None:
+        return RNG.permutation(arr, axis=axis)
+    return RNG.choice(arr, size, replace=False, axis=axis, shuffle=True)
 
 
-def roll():
+def roll(
+        expr: str,
+        n_rolls: int = 1) \
+        -> np.ndarray:
     """
     Dice roll, using `str` formatting.
+
+    `expr` is a sum of terms like '4d6kh3+d8-2': `NdS` rolls N S-sided
+    dice, `khK` / `klK` keep the K highest / lowest. All `n_rolls` are
+    drawn as one matrix per term.
+    """
+    terms, const = dice_plan(expr)
+    out = np.full(n_rolls, const, np.int64)
+    for sign, n, sides, keep, k in terms:
+        draws = RNG.integers(1, sides + 1, (n_rolls, n), dtype=np.int64)
+        if keep == 'h' and k < n:
+            draws = np.partition(draws, n - k, axis=1)[:, n - k:]
+        elif keep == 'l' and k < n:
+            draws = np.partition(draws, k - 1, axis=1)[:, :k]
+        out += sign * draws.sum(axis=1)
+    return out
+
+
+def roll_dist(
+        expr: str) \
+        -> pd.Series:
+    """
+    Exact outcome probabilities of `roll(expr)`, indexed by total.
     """
-    pass
+    terms, const = dice_plan(expr)
+    pmf, lo = np.ones(1), const
+    for sign, n, sides, keep, k in terms:
+        if keep and k < n:
+            term = keep_pmf(n, sides, keep, k)
+            term_lo = 0
+        else:
+            die = np.full(sides, 1 / sides)
+            term = np.ones(1)
+            for _ in range(n):
+                term = np.convolve(term, die)
+            term_lo = n
+        if sign < 0:
+            term = term[::-1]
+            term_lo = -(term_lo + len(term) - 1)
+        pmf = np.convolve(pmf, term)
+        lo += term_lo
+    values = np.arange(lo, lo + len(pmf))
+    pmf = pd.Series(pmf, index=values)
+    return pmf[pmf > 0]
 
 
-def r_onehot():
+def r_onehot(
+        n_rows: int,
+        n_classes: int,
+        p: Sequence[float] = None,
+        sparse_output: bool = False) \
+        -> Union[np.ndarray, sparse.csr_matrix]:
     """
     Onehot encoding.
+
+    Random class per row, as a `uint8` matrix or `scipy.sparse` CSR.
     """
-    pass
+    labels = RNG.choice(n_classes, n_rows, p=p).astype(index_dtype(n_classes))
+    if sparse_output:
+        return sparse.csr_matrix(
+            (np.ones(n_rows, np.uint8), labels, np.arange(n_rows + 1)),
+            shape=(n_rows, n_classes))
+    out = np.zeros((n_rows, n_classes), np.uint8)
+    out[np.arange(n_rows), labels] = 1
+    return out
 
 
-def r_strings():
+def r_strings(
+        n: int,
+        length: Union[int, Tuple[int, int]] = 8,
+        alphabet: str = ascii_letters + digits,
+        fmt: str = '{}',
+        output: str = 'U') \
+        -> Union[np.ndarray, ExtensionArray]:
     """
     Strings, optional formatting.
+
+    `length` is fixed or a `(min, max)` range, `fmt` wraps each string,
+    e.g. 'id-{}'. Characters are drawn as one code point matrix and
+    viewed as fixed-width strings. `output`: 'U', 'S', 'string' or
+    'category'.
     """
-    pass
+    chars = np.frombuffer(alphabet.encode('utf-32-le'), np.uint32)
+    lo, hi = (length, length) if isinstance(length, int) else length
+    mat = chars[RNG.integers(0, len(chars), (n, hi),
+                             dtype=index_dtype(len(chars)))]
+    lens = None if lo == hi else RNG.integers(lo, hi + 1, n)
+    prefix, suffix = split_fmt(fmt)
+    return as_strings(join_pieces([prefix, (mat, lens), suffix], n), output)
 
 
-def r_text():
+def r_text(
+        n: int,
+        words: Sequence[str],
+        n_words: int = 1,
+        sep: str = ' ',
+        fmt: str = '{}',
+        output: str = 'U') \
+        -> Union[np.ndarray, ExtensionArray]:
     """
     Dictionary sample, formatted.
+
+    `n_words` words from `words` per row, joined by `sep` and wrapped by
+    `fmt`. Rows are assembled from word indices as one code point
+    matrix. `output`: 'U', 'S', 'string' or 'category'.
     """
-    pass
+    words = np.asarray(words, dtype='U')
+    idx = RNG.integers(0, len(words), (n, n_words),
+                       dtype=index_dtype(len(words)))
+    if output == 'category' and n_words == 1 and fmt == '{}':
+        return pd.Categorical.from_codes(idx[:, 0], categories=words)
+
+    word_mat = code_points(words)
+    word_lens = np.char.str_len(words)
+    prefix, suffix = split_fmt(fmt)
+    pieces = [prefix]
+    for j in range(n_words):
+        if j:
+            pieces += [code_piece(sep)]
+        pieces += [(word_mat[idx[:, j]], word_lens[idx[:, j]])]
+    pieces += [suffix]
+    return as_strings(join_pieces(pieces, n), output)
 
 
-def seed():
+def seed(
+        entropy: int = None) \
+        -> np.random.SeedSequence:
     """
     RNG seed, for reproducible results.
     """
-    pass
+    global SEED, RNG
+    SEED = np.random.SeedSequence(entropy)
+    RNG = np.random.Generator(np.random.PCG64(SEED))
+    return SEED
+
+
+#
+# Helpers
+
+def as_strings(
+        mat: np.ndarray,
+        output: str = 'U') \
+        -> Union[np.ndarray, ExtensionArray]:
+    """
+    View `(n, width)` code point matrix as 1d fixed-width strings.
+    """
+    width = max(1, mat.shape[1])
+    mat = np.ascontiguousarray(mat, np.uint32).reshape(len(mat), -1)
+    if mat.shape[1] == 0:
+        mat = np.zeros((len(mat), 1), np.uint32)
+    if output == 'S':
+        if mat.size and mat.max() > 127:
+            raise ValueError("'S' output needs ASCII characters")
+        return mat.astype(np.uint8).view(f'S{width}').ravel()
+    arr = mat.view(f'U{width}').ravel()
+    if output == 'U':
+        return arr
+    elif output == 'string':
+        return pd.array(arr, dtype='string')
+    elif output == 'category':
+        return pd.Categorical(arr)
+    raise ValueError(f'Unknown output: {output!r}')
+
+
+def code_piece(
+        s: str) \
+        -> Tuple[np.ndarray, None]:
+    """
+    Constant string as a one-row code point piece.
+    """
+    return np.frombuffer(s.encode('utf-32-le'), np.uint32)[None], None
+
+
+def code_points(
+        arr: np.ndarray) \
+        -> np.ndarray:
+    """
+    `U` array as `(n, width)` code point matrix.
+    """
+    width = arr.dtype.itemsize // 4
+    return np.ascontiguousarray(arr).view(np.uint32).reshape(-1, width)
+
+
+def join_pieces(
+        pieces: Sequence[Tuple[np.ndarray, np.ndarray]],
+        n: int) \
+        -> np.ndarray:
+    """
+    Concatenate code point pieces row-wise, without gaps.
+
+    Each piece is a `(n or 1, w)` matrix and per-row lengths (or None
+    for all of `w`).
+    """
+    mats = [np.broadcast_to(m, (n, m.shape[1])) for m, _ in pieces]
+    if all(lens is None for _, lens in pieces):
+        return np.concatenate(mats, axis=1)
+
+    out = np.zeros((n, sum(m.shape[1] for m in mats)), np.uint32)
+    rows = np.arange(n)
+    off = np.zeros(n, np.intp)
+    for m, (_, lens) in zip(mats, pieces):
+        w = m.shape[1]
+        if lens is None:
+            lens = np.full(n, w)
+        # past-the-end writes are zeros, overwritten by later pieces
+        for k in range(w):
+            out[rows, off + k] = np.where(lens > k, m[:, k], 0)
+        off = off + lens
+    return out
+
+
+def split_fmt(
+        fmt: str) \
+        -> Tuple[Tuple[np.ndarray, None], Tuple[np.ndarray, None]]:
+    """
+    Prefix and suffix pieces around the `{}` in `fmt`.
+    """
+    prefix, _, suffix = fmt.partition('{}')
+    return code_piece(prefix), code_piece(suffix)
+
+
+def bootstrap_batch(
+        stream: np.random.SeedSequence,
+        n_samples: int,
+        size: int,
+        reducer: Callable[[np.ndarray], np.ndarray],
+        axis: int) \
+        -> np.ndarray:
+    """
+    Reduce one batch of resamples of `WORKER_ARR`.
+    """
+    n = WORKER_ARR.shape[axis]
+    gen = np.random.Generator(np.random.PCG64(stream))
+    idx = gen.integers(0, n, size=(n_samples, size), dtype=index_dtype(n))
+    return np.asarray(reducer(np.take(WORKER_ARR, idx, axis=axis)))
+
+
+@lru_cache(maxsize=None)
+def dice_plan(
+        expr: str) \
+        -> Tuple[Tuple[Tuple[int, int, int, str, int], ...], int]:
+    """
+    Parse dice `expr` into `(sign, n, sides, keep, k)` terms + constant.
+    """
+    terms, const, pos = [], 0, 0
+    expr = expr.strip().lower()
+    while pos < len(expr):
+        m = re_dice.match(expr, pos)
+        if not m or m.end() == pos or (pos and not m.group(1)):
+            raise ValueError(f'Invalid dice expression: {expr!r}')
+        sign = -1 if m.group(1) == '-' else 1
+        if m.group(6):
+            const += sign * int(m.group(6))
+        else:
+            n = int(m.group(2) or 1)
+            sides = int(m.group(3))
+            keep = m.group(4) or ''
+            k = int(m.group(5)) if keep else n
+            if sides < 1 or n < 1 or not 0 < k <= n:
+                raise ValueError(f'Invalid dice expression: {expr!r}')
+            terms += [(sign, n, sides, keep, k)]
+        pos = m.end()
+    if not terms and not pos:
+        raise ValueError(f'Invalid dice expression: {expr!r}')
+    return tuple(terms), const
+
+
+def index_dtype(
+        n: int) \
+        -> np.dtype:
+    """
+    Smallest signed int dtype that indexes `n` items.
+    """
+    return np.dtype(np.int32 if n < 2**31 else np.int64)
+
+
+def keep_pmf(
+        n: int,
+        sides: int,
+        keep: str,
+        k: int) \
+        -> np.ndarray:
+    """
+    Exact pmf of the sum of the `k` highest ('h') or lowest ('l') of
+    `n` dice, indexed from 0.
+
+    Dynamic program over face values, best first: `p[m, s]` is the
+    probability that `m` dice are assigned so far with kept sum `s`.
+    """
+    faces = range(sides, 0, -1) if keep == 'h' else range(1, sides + 1)
+    p = np.zeros((n + 1, k * sides + 1))
+    p[0, 0] = 1
+    for v in faces:
+        nxt = np.zeros_like(p)
+        for m in range(n + 1):
+            if not p[m].any():
+                continue
+            for j in range(n - m + 1):
+                shift = v * (min(m + j, k) - min(m, k))
+                w = comb(n - m, j) * sides**-j
+                nxt[m + j, shift:] += w * p[m, :p.shape[1] - shift]
+        p = nxt
+    return p[n]
+
+
+def set_worker_arr(
+        arr: np.ndarray) \
+        -> None:
+    """
+    Share `arr` with `bootstrap_batch` (pool initializer).
+    """
+    global WORKER_ARR
+    WORKER_ARR = arr
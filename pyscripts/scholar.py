@@ -3,12 +3,29 @@
 # Summary: https://creativecommons.org/publicdomain/zero/1.0/
 # Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
 
+import bz2
+import fnmatch
+import gzip
+import io
+import json
+import lzma
+import mmap
 import os
 import pickle
-from typing import Any, Callable, Sequence
+import re
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, ThreadPoolExecutor,
+                                as_completed, wait)
+from typing import Any, Callable, Iterator, Sequence, Tuple, Union
 
 import numpy as np
 
+import pandas as pd
+
+COLUMNS_VERSION = 1
+COMPRESSORS = {'gzip': gzip.open, 'bz2': bz2.open, 'lzma': lzma.open}
+MANIFEST = 'manifest.json'
+
 
 def read_file(
         path: str,
@@ -29,6 +46,43 @@ def read_file(
     return out
 
 
+def iter_lines(
+        path: str,
+        encoding: str = 'utf-8',
+        line_filter: str = None,
+        output: str = 'str',
+        block_size: int = 2**22) \
+        -> Iterator:
+    """
+    Lazy `read_file`, in binary blocks of about `block_size` bytes.
+
+    `line_filter` is a regex searched within each line, run over whole
+    blocks. `output`: 'str' yields lines, 'S' / 'U' yield one array per
+    block, 'offsets' yields `(buffer, offsets)` per block, Arrow-style:
+    line `i` is `buffer[offsets[i]:offsets[i + 1]]`.
+    """
+    pattern = None
+    if line_filter is not None:
+        pattern = re.compile(line_filter.encode(encoding), re.MULTILINE)
+
+    rest = b''
+    with open(path, 'rb') as file:
+        while True:
+            data = file.read(block_size)
+            if not data:
+                if rest:
+                    yield from block_lines(
+                        rest + b'\n', encoding, pattern, output)
+                return
+            cut = data.rfind(b'\n')
+            if cut < 0:
+                rest += data
+                continue
+            block = rest + data[:cut + 1]
+            rest = data[cut + 1:]
+            yield from block_lines(block, encoding, pattern, output)
+
+
 def scan_dir(
         path: str,
         folder_filter: Callable[str, bool] = lambda x: True,
@@ -54,43 +108,590 @@ def scan_dir(
     return out
 
 
+def index_dir(
+        path: str,
+        folder_filter: Union[str, re.Pattern, Callable[str, bool]] = None,
+        file_filter: Union[str, re.Pattern, Callable[str, bool]] = None,
+        recursive: bool = True,
+        with_stat: bool = False,
+        index_path: str = None,
+        n_jobs: int = 8) \
+        -> Sequence[Union[str, Tuple[str, int, float]]]:
+    """
+    Parallel, cached `scan_dir`.
+
+    Filters are glob strings, compiled regexes or callables on names.
+    Subtrees are scanned with `os.scandir` in a pool of `n_jobs` threads.
+    `with_stat` returns `(path, size, mtime)` from the scan's own stat.
+    With `index_path`, listings are pickled there and reused for
+    directories whose mtime is unchanged; edits that leave the directory
+    mtime alone (e.g. rewriting a file in place) go unseen.
+    """
+    folder_ok = compile_filter(folder_filter)
+    file_ok = compile_filter(file_filter)
+    cache, index = {}, {}
+    if index_path is not None and os.path.exists(index_path):
+        cache = read(index_path)
+
+    out = []
+    with ThreadPoolExecutor(max_workers=n_jobs) as ex:
+        pending = {ex.submit(list_dir, path, cache)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                dir_path, key, listing = fut.result()
+                index[key] = listing
+                _, files, subdirs = listing
+                for name, size, mtime in files:
+                    if file_ok(name):
+                        out += [(os.path.join(dir_path, name), size, mtime)]
+                if recursive:
+                    pending |= {
+                        ex.submit(list_dir, os.path.join(dir_path, d), cache)
+                        for d in subdirs if folder_ok(d)}
+
+    if index_path is not None:
+        write(index, index_path)
+    out.sort()
+    if with_stat:
+        return out
+    return [x[0] for x in out]
+
+
 def split_file(
         path: str,
         encoding: str = 'utf-8',
-        chunk_size: int = 1) \
+        chunk_size: int = 1,
+        as_bytes: bool = False,
+        block_size: int = 2**26) \
         -> np.ndarray:
     """
     Read text into `ndarray`, in chunks.
+
+    Line breaks are dropped and the rest is cut into `chunk_size`
+    characters per element (bytes, with `as_bytes`); the last chunk is
+    padded. The file is memory-mapped: `S` output without line breaks
+    is a read-only view of it, which keeps the file mapped for as long
+    as the array (or anything viewing it) is alive.
     """
-    with open(path, encoding=encoding) as file:
-        return np.fromiter(
-            file.read().replace('\n', ''), dtype=f'U{chunk_size}')
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return np.array([], dtype=f'{"S" if as_bytes else "U"}'
+                                      f'{chunk_size}')
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    buf = np.frombuffer(mm, np.uint8)
+    ascii_newlines = '\n'.encode(encoding) == b'\n'
+
+    if not as_bytes and not ascii_newlines:
+        text = str(mm[:], encoding).translate({10: None, 13: None})
+        return chunk_codes(text, chunk_size)
+
+    # pass 1: count line breaks, check for non-ascii bytes
+    n_breaks, is_ascii = 0, True
+    for i in range(0, size, block_size):
+        block = buf[i:i + block_size]
+        n_breaks += np.count_nonzero((block == 10) | (block == 13))
+        is_ascii = is_ascii and bool(block.max() < 128)
+    n = size - n_breaks
+
+    if not as_bytes and not is_ascii:
+        text = str(mm[:], encoding).translate({10: None, 13: None})
+        return chunk_codes(text, chunk_size)
+
+    if n_breaks == 0 and n % chunk_size == 0:
+        out = buf
+    else:
+        # pass 2: copy all but line breaks into a padded buffer
+        out = np.zeros(-(-n // chunk_size) * chunk_size, np.uint8)
+        j = 0
+        for i in range(0, size, block_size):
+            block = buf[i:i + block_size]
+            block = block[(block != 10) & (block != 13)]
+            out[j:j + len(block)] = block
+            j += len(block)
+
+    if as_bytes:
+        return out.view(f'S{chunk_size}')
+    return out.astype(np.uint32).view(f'U{chunk_size}')
 
 
 def write(
         obj: Any,
-        save_path: str) \
+        save_path: str,
+        fmt: str = 'pickle',
+        compress: Union[str, dict] = None) \
         -> None:
     """
-    Pickle `obj`.
+    Pickle `obj`, or with `fmt='columns'` save an ndarray, Series or
+    DataFrame as a directory: one `.npy` file per column plus a
+    manifest. `compress` is 'gzip', 'bz2' or 'lzma', for every column or
+    as a dict by column name; compressed columns cannot be mmapped.
     """
+    if fmt == 'columns':
+        write_columns(obj, save_path, compress)
+        return
+    elif fmt != 'pickle':
+        raise ValueError(f'Unknown format: {fmt!r}')
     with open(save_path, 'wb') as file:
         pickle.dump(obj, file, pickle.HIGHEST_PROTOCOL)
 
 
 def read(
-        path: str) \
+        path: str,
+        columns: Sequence = None,
+        mmap_mode: str = 'c') \
         -> Any:
     """
-    Unpickle file at `path`.
+    Unpickle file at `path`, or load a `fmt='columns'` directory.
+
+    Columnar data is memory-mapped (`mmap_mode`, None to load) and only
+    `columns` are read, if given.
     """
+    if os.path.isfile(os.path.join(path, MANIFEST)):
+        return read_columns(path, columns, mmap_mode)
     with open(path, 'rb') as file:
         data = pickle.load(file)
     return data
 
 
-def write_arr():
+def read_many(
+        paths: Sequence[str],
+        reader: Callable[..., Any] = read,
+        n_jobs: int = 16,
+        ordered: bool = True,
+        window: int = None,
+        **kwargs) \
+        -> Iterator[Tuple[str, Any, Exception]]:
+    """
+    Read many files at once, e.g. `scan_dir` output.
+
+    Yields `(path, data, error)` per file, in `paths` order or, with
+    `ordered=False`, as each finishes. A failed file has `data=None` and
+    its exception as `error`; the rest of the batch carries on.
+
+    At most `window` reads (default `4 * n_jobs`) are in flight, and
+    stopping early cancels the ones not yet started.
+    """
+    window = window or 4 * n_jobs
+    ex = ThreadPoolExecutor(max_workers=n_jobs)
+    pending = deque() if ordered else set()
+    try:
+        for p in paths:
+            fut = ex.submit(read_one, reader, p, kwargs)
+            if ordered:
+                pending.append(fut)
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            else:
+                pending.add(fut)
+                if len(pending) >= window:
+                    done, pending = wait(
+                        pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        yield fut.result()
+        if ordered:
+            while pending:
+                yield pending.popleft().result()
+        else:
+            for fut in as_completed(pending):
+                yield fut.result()
+    finally:
+        ex.shutdown(cancel_futures=True)
+
+
+def write_arr(
+        arr: np.ndarray,
+        save_path: str,
+        fmt: Union[str, Sequence[str]] = None,
+        sep: str = ' ',
+        compress: str = None,
+        encoding: str = 'utf-8',
+        chunk_rows: int = 2**16) \
+        -> None:
     """
     Write each row of array as line of text.
+
+    `fmt` is a %-format for all columns or one per column (None: a
+    round-trip format for the dtype). Each block of `chunk_rows` rows is
+    formatted in one batched `%` call and written through a buffered
+    binary handle, compressed with 'gzip', 'bz2', 'lzma' or 'zstd'.
+    """
+    arr = np.asarray(arr)
+    if arr.ndim < 2:
+        arr = arr.reshape(-1, 1)
+    if arr.dtype.kind == 'S':
+        arr = np.char.decode(arr, encoding)
+    if fmt is None:
+        fmt = default_fmt(arr.dtype)
+    if isinstance(fmt, str):
+        fmt = [fmt] * arr.shape[1]
+    if len(fmt) != arr.shape[1]:
+        raise ValueError(
+            f'{len(fmt)} formats for {arr.shape[1]} columns')
+    with open_compressed(save_path, compress) as file:
+        for i in range(0, len(arr), chunk_rows):
+            file.write(format_rows(arr[i:i + chunk_rows], fmt, sep, encoding))
+
+
+#
+# Helpers
+
+def open_compressed(
+        path: str,
+        compress: str = None,
+        buffer_size: int = 2**20) \
+        -> Any:
+    """
+    Buffered binary write handle, optionally compressed.
+    """
+    if compress is None:
+        return open(path, 'wb', buffering=buffer_size)
+    if compress == 'zstd':
+        import zstandard
+        return io.BufferedWriter(
+            zstandard.ZstdCompressor().stream_writer(open(path, 'wb')),
+            buffer_size)
+    return io.BufferedWriter(COMPRESSORS[compress](path, 'wb'), buffer_size)
+
+
+def read_columns(
+        path: str,
+        columns: Sequence = None,
+        mmap_mode: str = 'c') \
+        -> Any:
+    """
+    Load a directory written by `write_columns`.
+    """
+    with open(os.path.join(path, MANIFEST)) as file:
+        manifest = json.load(file)
+    if manifest['version'] > COLUMNS_VERSION:
+        raise ValueError(
+            f"Unsupported columns format version: {manifest['version']}")
+    if manifest['kind'] == 'ndarray':
+        return read_column(path, manifest['columns'][0], mmap_mode)
+
+    labels = read(os.path.join(path, 'labels.pkl'))
+    index = labels['index']
+    if index is None:
+        index = pd.Index(read_column(path, manifest['index'], mmap_mode),
+                         name=labels['index_name'], copy=False)
+    entries = manifest['columns']
+    names = labels['columns']
+    if columns is not None:
+        pos = [names.get_loc(c) for c in columns]
+        entries, names = [entries[i] for i in pos], names[pos]
+
+    arrays = {i: read_column(path, e, mmap_mode)
+              for i, e in enumerate(entries)}
+    df = pd.DataFrame(arrays, index=index, copy=False)
+    df.columns = names
+    if manifest['kind'] == 'Series':
+        return df.iloc[:, 0].rename(labels.get('name'))
+    return df
+
+
+def read_one(
+        reader: Callable[..., Any],
+        path: str,
+        kwargs: dict) \
+        -> Tuple[str, Any, Exception]:
+    """
+    `(path, reader(path), None)`, or `(path, None, error)`.
+    """
+    try:
+        return path, reader(path, **kwargs), None
+    except Exception as e:
+        return path, None, e
+
+
+def read_column(
+        path: str,
+        entry: dict,
+        mmap_mode: str = 'c') \
+        -> Any:
+    """
+    One column file, as listed in a columns manifest.
+    """
+    file_path = os.path.join(path, entry['file'])
+    if entry['kind'] == 'pickle' and entry['compress']:
+        with COMPRESSORS[entry['compress']](file_path, 'rb') as file:
+            return pickle.load(file)
+    if entry['kind'] == 'pickle':
+        return read(file_path)
+    if entry['compress']:
+        with COMPRESSORS[entry['compress']](file_path, 'rb') as file:
+            arr = np.load(file)
+    else:
+        # plain ndarray view, pandas rejects the memmap subclass
+        arr = np.asarray(np.load(file_path, mmap_mode=mmap_mode))
+    if entry['kind'] == 'category':
+        dtype = read(os.path.join(path, entry['categories']))
+        return pd.Categorical.from_codes(arr, dtype=dtype)
+    return arr
+
+
+def write_columns(
+        obj: Any,
+        save_path: str,
+        compress: Union[str, dict] = None) \
+        -> None:
+    """
+    Save ndarray, Series or DataFrame as per-column files + manifest.
+    """
+    os.makedirs(save_path, exist_ok=True)
+    manifest = {'format': 'pyscripts-columns', 'version': COLUMNS_VERSION}
+
+    if isinstance(obj, np.ndarray):
+        manifest['kind'] = 'ndarray'
+        manifest['columns'] = [
+            write_column(obj, save_path, 'c0', col_compress(compress, None))]
+    else:
+        manifest['kind'] = type(obj).__name__
+        df = obj.to_frame() if isinstance(obj, pd.Series) else obj
+        labels = {'columns': df.columns, 'index': None,
+                  'index_name': df.index.name,
+                  'name': getattr(obj, 'name', None)}
+        if isinstance(df.index, (pd.RangeIndex, pd.MultiIndex)):
+            labels['index'] = df.index
+        else:
+            manifest['index'] = write_column(
+                pd.Series(df.index), save_path, 'index',
+                col_compress(compress, None))
+        write(labels, os.path.join(save_path, 'labels.pkl'))
+        manifest['columns'] = [
+            write_column(df.iloc[:, i], save_path, f'c{i}',
+                         col_compress(compress, name))
+            for i, name in enumerate(df.columns)]
+
+    with open(os.path.join(save_path, MANIFEST), 'w') as file:
+        json.dump(manifest, file, indent=1)
+
+
+def write_column(
+        col: Any,
+        save_path: str,
+        name: str,
+        compress: str = None) \
+        -> dict:
+    """
+    Save one column, return its manifest entry.
+    """
+    entry = {'file': name + '.npy', 'kind': 'npy', 'compress': compress}
+    if isinstance(col, pd.Series):
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            entry['kind'] = 'category'
+            entry['categories'] = name + '.categories.pkl'
+            write(col.dtype, os.path.join(save_path, entry['categories']))
+            col = col.cat.codes.to_numpy()
+        elif isinstance(col.dtype, np.dtype) and col.dtype.kind != 'O':
+            col = col.to_numpy()
+        else:
+            col = col.array
+    if not isinstance(col, np.ndarray) or col.dtype.kind == 'O':
+        entry.update(file=name + '.pkl', kind='pickle')
+    if compress:
+        entry['file'] += '.' + compress
+    file_path = os.path.join(save_path, entry['file'])
+
+    if entry['kind'] == 'pickle' and compress:
+        with COMPRESSORS[compress](file_path, 'wb') as file:
+            pickle.dump(col, file, pickle.HIGHEST_PROTOCOL)
+    elif entry['kind'] == 'pickle':
+        write(col, file_path)
+    elif compress:
+        with COMPRESSORS[compress](file_path, 'wb') as file:
+            np.save(file, col)
+    else:
+        np.save(file_path, col)
+    return entry
+
+
+def col_compress(
+        compress: Union[str, dict, None],
+        name: Any) \
+        -> str:
+    """
+    Compression for column `name`.
+    """
+    if isinstance(compress, dict):
+        return compress.get(name)
+    return compress
+
+
+def block_lines(
+        block: bytes,
+        encoding: str,
+        pattern: re.Pattern,
+        output: str) \
+        -> Iterator:
+    """
+    Lines of `block`, which ends with a newline, in `output` form.
+    """
+    if output == 'str' and pattern is None:
+        text = block.decode(encoding)
+        if '\r' in text:
+            text = text.replace('\r\n', '\n')
+        yield from text.split('\n')[:-1]
+        return
+
+    buf = np.frombuffer(block, np.uint8)
+    starts, ends = line_spans(buf, block, pattern)
+    if output == 'str':
+        for a, b in zip(starts.tolist(), ends.tolist()):
+            yield block[a:b].decode(encoding)
+    elif output == 'offsets':
+        yield spans_to_offsets(buf, starts, ends)
+    elif output == 'S':
+        yield spans_to_array(buf, starts, ends)
+    elif output == 'U':
+        yield np.char.decode(spans_to_array(buf, starts, ends), encoding)
+    else:
+        raise ValueError(f'Unknown output: {output!r}')
+
+
+def compile_filter(
+        f: Union[str, re.Pattern, Callable[str, bool], None]) \
+        -> Callable[str, bool]:
+    """
+    Name filter from a glob, compiled regex or callable.
+    """
+    if f is None:
+        return lambda x: True
+    if isinstance(f, re.Pattern):
+        return lambda x: f.search(x) is not None
+    if isinstance(f, str):
+        pattern = re.compile(fnmatch.translate(f))
+        return lambda x: pattern.match(x) is not None
+    return f
+
+
+def list_dir(
+        path: str,
+        cache: dict) \
+        -> Tuple[str, str, Tuple[int, list, list]]:
+    """
+    `path`, its index key and `(mtime, files, subdirs)` listing, taken
+    from `cache` if the directory mtime is unchanged.
+    """
+    key = os.path.abspath(path)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return path, key, (None, [], [])
+    cached = cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return path, key, cached
+
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        subdirs += [e.name]
+                    elif e.is_file():
+                        st = e.stat()
+                        files += [(e.name, st.st_size, st.st_mtime)]
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    return path, key, (mtime, files, subdirs)
+
+
+def chunk_codes(
+        text: str,
+        chunk_size: int) \
+        -> np.ndarray:
+    """
+    `text` as `U{chunk_size}` array, via its code points.
+    """
+    codes = np.frombuffer(text.encode('utf-32-le'), np.uint32)
+    out = np.zeros(-(-len(codes) // chunk_size) * chunk_size, np.uint32)
+    out[:len(codes)] = codes
+    return out.view(f'U{chunk_size}')
+
+
+def format_rows(
+        block: np.ndarray,
+        fmt: Sequence[str],
+        sep: str,
+        encoding: str = 'utf-8') \
+        -> bytes:
+    """
+    2d array as newline-terminated lines, formatted in one `%` call.
+    """
+    line = sep.replace('%', '%%').join(fmt) + '\n'
+    return (line * len(block) % tuple(block.ravel().tolist())) \
+        .encode(encoding)
+
+
+def default_fmt(
+        dtype: np.dtype) \
+        -> str:
+    """
+    %-format that round-trips values of `dtype`.
+    """
+    if dtype.kind in 'iub':
+        return '%d' if dtype.kind != 'b' else '%s'
+    if dtype.kind == 'f':
+        return {2: '%.5g', 4: '%.9g'}.get(dtype.itemsize, '%r')
+    return '%s'
+
+
+def line_spans(
+        buf: np.ndarray,
+        block: bytes,
+        pattern: re.Pattern = None) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Start and end (exclusive, before any CR LF) of each line.
+    """
+    ends = np.flatnonzero(buf == ord('\n'))
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    if pattern is not None:
+        # lines holding a match
+        hits = np.fromiter((m.start() for m in pattern.finditer(block)),
+                           np.int64)
+        lines = np.unique(np.searchsorted(ends, hits))
+        lines = lines[lines < len(ends)]
+        starts, ends = starts[lines], ends[lines]
+    if len(ends):
+        ends = ends - (buf[np.maximum(ends - 1, 0)] == ord('\r')) \
+            * (ends > starts)
+    return starts, ends
+
+
+def spans_to_array(
+        buf: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray) \
+        -> np.ndarray:
+    """
+    Fixed-width `S` array of `buf[start:end]` slices.
+    """
+    lens = ends - starts
+    width = max(1, int(lens.max(initial=0)))
+    data, offsets = spans_to_offsets(buf, starts, ends)
+    dst = np.repeat(np.arange(len(lens)) * width - offsets[:-1], lens)
+    dst += np.arange(len(data))
+    mat = np.zeros(len(lens) * width, np.uint8)
+    mat[dst] = data
+    return mat.view(f'S{width}')
+
+
+def spans_to_offsets(
+        buf: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Contiguous buffer of `buf[start:end]` slices, plus their offsets.
     """
-    pass
+    offsets = np.concatenate([[0], np.cumsum(ends - starts)])
+    edges = np.zeros(len(buf) + 1, np.int8)
+    edges[starts] += 1
+    edges[ends] -= 1
+    keep = np.cumsum(edges[:-1], dtype=np.int8).astype(bool)
+    return buf[keep], offsets
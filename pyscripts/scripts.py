@@ -3,54 +3,167 @@
 # Summary: https://creativecommons.org/publicdomain/zero/1.0/
 # Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
 
+import ast
+import asyncio
 import inspect
 import os
 import re
+import shlex
 import subprocess
+import threading
 import time
-from typing import Any, List, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import (Any, Callable, FrozenSet, Iterator, List, Sequence,
+                    Tuple, Union)
 
-import numpy
-
-import pandas
 import requests
 from pyscripts.hero import re_github, re_imports
 from pyscripts.knot import os_path, path_pieces
-from pyscripts.scholar import read_file, scan_dir
+from pyscripts.scholar import index_dir, read, read_file, write
 from stdlib_list import stdlib_list
 
+# path -> (mtime, size, import names)
+IMPORT_CACHE = {}
+
+SEARCH_URL = 'https://www.google.com/search?q={query}'
+
+
+class TokenBucket:
+    """
+    Thread-safe rate limiter: `rate` calls per second, bursts up to
+    `capacity`.
+    """
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            wait = (1 - self.tokens) / self.rate
+            self.tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+
 
 def google(
-        query: str) \
+        query: str,
+        session: requests.Session = None,
+        search_url: str = SEARCH_URL) \
         -> str:
     """
     Google query HTML.
     """
-    rq = requests.get(f'https://www.google.com/search?q={query}')
+    rq = (session or requests).get(search_url.format(query=query))
+    rq.raise_for_status()
     return rq.text
 
 
 def package_urls(
-        project_path: str) \
+        project_path: str,
+        rate: float = 2,
+        n_jobs: int = 4,
+        retries: int = 3,
+        backoff: float = 0.5,
+        cache_path: str = None,
+        ttl: float = 7 * 24 * 3600,
+        search_url: str = SEARCH_URL,
+        session: requests.Session = None) \
         -> dict:
-    url_dict = {}
+    """
+    GitHub URL per package in `requirements.txt`, None if not found.
+
+    Up to `n_jobs` searches share one pooled `session` and a `rate`
+    per second token bucket; failed requests are retried with
+    exponential `backoff`. With `cache_path`, results are kept on disk
+    for `ttl` seconds. `search_url` is a template with a `{query}`
+    field, e.g. a local stub server for tests.
+    """
     package_names = read_file(
         os_path(project_path + os.sep + 'requirements.txt'))
-    for nm in package_names:
-        raw = google(f'github {nm}')
-        url_dict[nm] = re_github.search(raw).group()
-        time.sleep(0.5)
-    return url_dict
+    cache = {}
+    if cache_path is not None and os.path.exists(cache_path):
+        cache = read(cache_path)
+
+    now = time.time()
+    url_dict = {nm: cache[nm][1] for nm in package_names
+                if nm in cache and now - cache[nm][0] < ttl}
+    todo = [nm for nm in package_names if nm not in url_dict]
+
+    if todo:
+        own_session = session is None
+        if own_session:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=n_jobs)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        bucket = TokenBucket(rate)
+
+        def resolve(nm):
+            raw = fetch(f'github {nm}', session, search_url, bucket,
+                        retries, backoff)
+            match = re_github.search(raw) if raw is not None else None
+            return nm, match.group() if match else None, raw is not None
+
+        try:
+            with ThreadPoolExecutor(max_workers=n_jobs) as ex:
+                for nm, url, ok in ex.map(resolve, todo):
+                    url_dict[nm] = url
+                    if ok:
+                        cache[nm] = (time.time(), url)
+        finally:
+            if own_session:
+                session.close()
+        if cache_path is not None:
+            write(cache, cache_path)
+
+    return {nm: url_dict[nm] for nm in package_names}
 
 
 def pytest_skeleton(
         module: Any) \
         -> str:
     names = [x[0] for x in inspect.getmembers(module, inspect.isfunction)]
-    s = ''
-    for x in names:
-        s += f'def test_{x}():\n    pass\n'
-    return s
+    return skeleton(names)
+
+
+def pytest_skeletons(
+        path: str,
+        tests_path: str,
+        n_jobs: int = None) \
+        -> List[str]:
+    """
+    Write `<module>_test.py` stubs for a package, without importing it.
+
+    Top-level functions and classes are read with `ast`, one process per
+    file. Tests already in an existing test module are skipped; missing
+    ones are appended. Returns the test files written.
+    """
+    files = index_dir(path, file_filter=re.compile(r'^(?!__).*\.py$'))
+    targets = [
+        os.path.normpath(os.path.join(
+            tests_path, os.path.relpath(os.path.dirname(f), path),
+            os.path.basename(f)[:-3] + '_test.py'))
+        for f in files]
+    with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+        stubs = list(ex.map(missing_tests, files, targets, chunksize=8))
+
+    written = []
+    for target, text in zip(targets, stubs):
+        if not text:
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'a', encoding='utf-8') as file:
+            file.write(text)
+        written += [target]
+    return written
 
 
 def console(
@@ -62,20 +175,110 @@ def console(
         encoding='utf-8').stdout
 
 
+def console_lines(
+        command: Union[str, Sequence[str]],
+        regex: str = None,
+        timeout: float = None,
+        encoding: str = 'utf-8') \
+        -> Iterator[str]:
+    """
+    Stream stdout of `command` line by line, as it is printed.
+
+    Only lines matching `regex` are yielded. The process is killed after
+    `timeout` seconds (raising `subprocess.TimeoutExpired`) or when the
+    caller stops iterating.
+    """
+    pattern = re.compile(regex) if regex else None
+    proc = subprocess.Popen(
+        split_command(command),
+        stdout=subprocess.PIPE,
+        encoding=encoding,
+        errors='replace',
+        bufsize=1)
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer:
+        timer.start()
+    try:
+        for line in proc.stdout:
+            line = line.rstrip('\r\n')
+            if pattern is None or pattern.search(line):
+                yield line
+    finally:
+        if timer:
+            timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(command, timeout)
+
+
+def console_many(
+        commands: Sequence[Union[str, Sequence[str]]],
+        max_concurrency: int = 4,
+        regex: str = None,
+        timeout: float = None,
+        on_line: Callable[[int, str], Any] = None,
+        encoding: str = 'utf-8') \
+        -> List[Union[List[str], Exception]]:
+    """
+    Run `commands` as asyncio subprocesses, `max_concurrency` at a time.
+
+    Returns each command's stdout lines matching `regex`, or the
+    exception it raised (e.g. `subprocess.TimeoutExpired`). `on_line(i,
+    line)` sees lines of command `i` as they arrive.
+    """
+    pattern = re.compile(regex) if regex else None
+
+    async def run(i, command, sem):
+        async with sem:
+            proc = await asyncio.create_subprocess_exec(
+                *split_command(command),
+                stdout=asyncio.subprocess.PIPE,
+                limit=2**20)
+            out = []
+
+            async def pump():
+                async for raw in proc.stdout:
+                    line = raw.decode(encoding, 'replace').rstrip('\r\n')
+                    if pattern is None or pattern.search(line):
+                        out.append(line)
+                        if on_line:
+                            on_line(i, line)
+                await proc.wait()
+
+            try:
+                await asyncio.wait_for(pump(), timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise subprocess.TimeoutExpired(command, timeout)
+            return out
+
+    async def main():
+        sem = asyncio.Semaphore(max_concurrency)
+        return await asyncio.gather(
+            *[run(i, c, sem) for i, c in enumerate(commands)],
+            return_exceptions=True)
+
+    return asyncio.run(main())
+
+
 def pipdeptree(
         regex: str = r'^\w+') \
         -> None:
     """
     `pipdeptree` wrapper.
     """
-    lines = console('pipdeptree').split('\r\n')
-    regex_filter = re.compile(regex)
-    out = []
-    for l in lines:
-        if regex_filter.search(l):
-            out += [l]
-    for item in out:
-        print(item)
+    for line in console_lines('pipdeptree', regex=regex):
+        print(line, flush=True)
 
 
 def pip_review(
@@ -84,42 +287,52 @@ def pip_review(
     """
     `pip-review` wrapper.
     """
-    print(console(f'pip-review {args}'))
+    for line in console_lines(f'pip-review {args}'):
+        print(line, flush=True)
 
 
 def requirements(
         path: str,
         project_name: str = None,
-        lib_aliases=None) \
+        lib_aliases=None,
+        cache_path: str = None,
+        n_jobs: int = None) \
         -> Tuple[List[str], List[str]]:
     """
     Project imports.
+
+    Imports are parsed with `ast` and cached per file by mtime and size,
+    in `IMPORT_CACHE` and, with `cache_path`, on disk. Changed files are
+    parsed in a process pool when there are many.
     """
     if project_name is None:
         project_name = path_pieces(path)[-1]
     if lib_aliases is None:
         lib_aliases = {'sklearn': 'scikit-learn'}
+    if cache_path is not None and os.path.exists(cache_path):
+        IMPORT_CACHE.update(read(cache_path))
 
-    file_list = scan_dir(path, file_filter=lambda x: x.endswith('.py'))
-
-    import_statements = []
-    for file in file_list:
-        import_statements += read_file(
-            file,
-            line_filter=is_import,
-            break_condition=lambda x: x.startswith('def '))
-
-    names = []
-    for line in import_statements:
-        re_match = re_imports.search(line)
-        if re_match:
-            name = re_match.group(2)
-            names += [lib_aliases.get(name, name)]
+    files = index_dir(path, file_filter='*.py', with_stat=True)
+    stale = [f for f, size, mtime in files
+             if IMPORT_CACHE.get(f, (None, None))[:2] != (mtime, size)]
+    if len(stale) > 64:
+        with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+            parsed = list(ex.map(file_imports, stale, chunksize=16))
+    else:
+        parsed = [file_imports(f) for f in stale]
+    stat = {f: (mtime, size) for f, size, mtime in files}
+    for f, names in zip(stale, parsed):
+        IMPORT_CACHE[f] = (*stat[f], names)
+    if cache_path is not None:
+        write({f: IMPORT_CACHE[f] for f in stat}, cache_path)
 
-    names = pandas.unique(names)
-    names = names[names != project_name]
-    extlib_names = sorted(numpy.setdiff1d(names, stdlib_list()))
-    stdlib_names = sorted(numpy.intersect1d(names, stdlib_list()))
+    names = set()
+    for f in stat:
+        names |= IMPORT_CACHE[f][2]
+    names = {lib_aliases.get(x, x) for x in names} - {project_name}
+    stdlib = stdlib_set()
+    extlib_names = sorted(x for x in names if x not in stdlib)
+    stdlib_names = sorted(x for x in names if x in stdlib)
 
     return extlib_names, stdlib_names
 
@@ -127,6 +340,115 @@ def requirements(
 #
 # Helpers
 
+def defined_names(
+        path: str,
+        kinds: Tuple[type, ...] = (ast.FunctionDef, ast.AsyncFunctionDef,
+                                   ast.ClassDef)) \
+        -> List[str]:
+    """
+    Names of top-level `kinds` definitions in a `.py` file.
+    """
+    try:
+        with open(path, 'rb') as file:
+            tree = ast.parse(file.read(), path)
+    except (SyntaxError, ValueError, OSError):
+        return []
+    return [x.name for x in tree.body if isinstance(x, kinds)]
+
+
+def missing_tests(
+        path: str,
+        test_path: str) \
+        -> str:
+    """
+    Test stubs for definitions in `path` not yet in `test_path`.
+    """
+    existing = set()
+    if os.path.exists(test_path):
+        existing = set(defined_names(test_path))
+    names = [x for x in defined_names(path)
+             if f'test_{x}' not in existing]
+    if not names:
+        return ''
+    prefix = '\n\n' if existing else ''
+    return prefix + skeleton(names, sep='\n\n')
+
+
+def skeleton(
+        names: Sequence[str],
+        sep: str = '') \
+        -> str:
+    """
+    Empty pytest function per name.
+    """
+    return sep.join(f'def test_{x}():\n    pass\n' for x in names)
+
+
+def split_command(
+        command: Union[str, Sequence[str]]) \
+        -> Sequence[str]:
+    """
+    Argument list for `command`, split shell-style if a string.
+    """
+    if isinstance(command, str):
+        return shlex.split(command, posix=os.name != 'nt')
+    return command
+
+
+def fetch(
+        query: str,
+        session: requests.Session,
+        search_url: str,
+        bucket: TokenBucket,
+        retries: int = 3,
+        backoff: float = 0.5) \
+        -> str:
+    """
+    `google(query)`, rate limited and retried; None if all tries fail.
+    """
+    for i in range(retries + 1):
+        bucket.acquire()
+        try:
+            return google(query, session, search_url)
+        except requests.RequestException:
+            if i < retries:
+                time.sleep(backoff * 2**i)
+    return None
+
+
+def file_imports(
+        path: str) \
+        -> FrozenSet[str]:
+    """
+    Top-level names of absolute imports anywhere in a `.py` file.
+    """
+    try:
+        with open(path, 'rb') as file:
+            tree = ast.parse(file.read(), path)
+    except (SyntaxError, ValueError, OSError):
+        # not python 3 source, fall back to line matching
+        lines = read_file(path, line_filter=is_import, encoding='latin-1')
+        return frozenset(m.group(2) for m in map(re_imports.search, lines)
+                         if m)
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names |= {a.name.split('.')[0] for a in node.names}
+        elif isinstance(node, ast.ImportFrom) and not node.level:
+            names.add(node.module.split('.')[0])
+    return frozenset(names)
+
+
+@lru_cache(maxsize=None)
+def stdlib_set() \
+        -> FrozenSet[str]:
+    """
+    Standard library module names.
+    """
+    return frozenset(stdlib_list())
+
+
 def is_import(
         x: str) \
         -> bool:
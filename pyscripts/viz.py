@@ -4,37 +4,101 @@
 # Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
 
 
+import os
+from concurrent.futures import ProcessPoolExecutor
 from math import ceil
-from typing import Sequence
+from typing import List, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
-import seaborn as sns
 from matplotlib import pyplot as plt
-from sklearn.metrics import confusion_matrix
+from matplotlib.figure import Figure
 
 MAX_WIDTH = 24
 MAX_HEIGHT = 20
+MAX_PANELS = 36
+
+
+def confmat(
+        y: Sequence,
+        y_hat: Sequence,
+        labels: Sequence = None,
+        normalize: str = None,
+        chunk_size: int = 2**24) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Confusion matrix and its sorted labels, counted in chunks.
+
+    Labels are encoded with a hashed `pd.Index` lookup and counted with one
+    `np.bincount` per `chunk_size` pairs. Pairs with a label outside
+    `labels` are dropped. `normalize` is 'true' (rows), 'pred' (cols),
+    'all' or None, as in `sklearn.metrics.confusion_matrix`.
+    """
+    y, y_hat = np.asarray(y), np.asarray(y_hat)
+    if labels is None:
+        seen = set()
+        for i in range(0, len(y), chunk_size):
+            seen.update(pd.unique(y[i:i + chunk_size]))
+            seen.update(pd.unique(y_hat[i:i + chunk_size]))
+        labels = sorted(seen)
+    labels = np.asarray(labels)
+    index = pd.Index(labels)
+    k = len(labels)
+
+    cm = np.zeros(k * k, dtype=np.int64)
+    for i in range(0, len(y), chunk_size):
+        t = index.get_indexer(y[i:i + chunk_size])
+        p = index.get_indexer(y_hat[i:i + chunk_size])
+        ok = (t >= 0) & (p >= 0)
+        cm += np.bincount(t[ok] * k + p[ok], minlength=k * k)
+    cm = cm.reshape(k, k)
+
+    if normalize is None:
+        return cm, labels
+    total = {
+        'true': cm.sum(axis=1, keepdims=True),
+        'pred': cm.sum(axis=0, keepdims=True),
+        'all': cm.sum()
+    }[normalize]
+    return np.divide(cm, total, out=np.zeros(cm.shape), where=total > 0), \
+        labels
 
 
 def plot_confmat(
         y: pd.Series,
         y_hat: Sequence,
         rotate_x: int = 0,
-        rotate_y: int = 'vertical') \
+        rotate_y: int = 'vertical',
+        normalize: str = None,
+        top_k: int = None,
+        max_annot: int = 400,
+        max_ticks: int = 100) \
         -> None:
     """
-    Plot confusion matrix using `seaborn`.
-    """
-    classes = y.unique()
-    ax = sns.heatmap(
-        confusion_matrix(y, y_hat),
-        xticklabels=classes,
-        yticklabels=classes,
-        annot=True,
-        square=True,
-        cmap="Blues",
-        fmt='d',
-        cbar=False)
+    Plot confusion matrix with `imshow`.
+
+    Counts come from `confmat`, in sorted label order. `top_k` keeps
+    the classes with the most errors. Cells are annotated only if there
+    are at most `max_annot` of them, and ticks labelled only for at
+    most `max_ticks` classes.
+    """
+    cm, labels = confmat(y, y_hat, normalize=normalize)
+    if top_k is not None:
+        keep = np.sort(most_confused(cm, top_k))
+        cm, labels = cm[np.ix_(keep, keep)], labels[keep]
+
+    ax = plt.gca()
+    ax.imshow(cm, cmap='Blues', interpolation='nearest')
+    if cm.size <= max_annot:
+        fmt = 'd' if normalize is None else '.2f'
+        dark = cm > cm.max() / 2
+        for (r, c), x in np.ndenumerate(cm):
+            ax.text(c, r, f'{x:{fmt}}', ha='center', va='center',
+                    color='white' if dark[r, c] else 'black')
+    if len(labels) <= max_ticks:
+        ticks = np.arange(len(labels))
+        ax.set_xticks(ticks, labels=labels)
+        ax.set_yticks(ticks, labels=labels)
     ax.xaxis.tick_top()
     ax.xaxis.set_label_position('top')
     plt.xticks(rotation=rotate_x)
@@ -43,9 +107,74 @@ def plot_confmat(
     plt.ylabel('True Value')
 
 
+def plot_grid(
+        df: pd.DataFrame,
+        bins: int = 30,
+        max_levels: int = 20,
+        max_width: int = MAX_WIDTH,
+        max_height: int = MAX_HEIGHT) \
+        -> Figure:
+    """
+    Small multiples: one panel per column of `df`.
+
+    Numeric columns are drawn as histograms with `bins` bins, others as
+    bars of their `max_levels` most frequent values.
+    """
+    panels = grid_panels(df, bins, max_levels)
+    fig = plt.figure(figsize=fig_dims(len(panels), max_width, max_height))
+    draw_grid(fig, panels)
+    return fig
+
+
+def save_grid(
+        df: pd.DataFrame,
+        save_path: str,
+        fmt: str = 'png',
+        max_panels: int = MAX_PANELS,
+        n_jobs: int = None,
+        bins: int = 30,
+        max_levels: int = 20,
+        dpi: int = 100) \
+        -> List[str]:
+    """
+    Save `plot_grid` figures of `max_panels` columns each.
+
+    Figures go to `save_path`_000.`fmt`, `save_path`_001.`fmt`, ...
+    Panel data is computed up front, so only counts are sent to the
+    `n_jobs` worker processes, which render without `pyplot` (Agg for
+    png). `n_jobs=None` renders serially, -1 uses all cores.
+    """
+    panels = grid_panels(df, bins, max_levels)
+    pages = [panels[i:i + max_panels]
+             for i in range(0, len(panels), max_panels)]
+    paths = [f'{save_path}_{i:03d}.{fmt}' for i in range(len(pages))]
+    args = [(page, path, dpi) for page, path in zip(pages, paths)]
+
+    if n_jobs is None or len(pages) < 2:
+        for a in args:
+            save_fig(a)
+    else:
+        n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        with ProcessPoolExecutor(
+                max_workers=max(1, min(n_jobs, len(pages)))) as ex:
+            list(ex.map(save_fig, args))
+    return paths
+
+
 #
 # Helpers
 
+def most_confused(
+        cm: np.ndarray,
+        k: int) \
+        -> np.ndarray:
+    """
+    Indices of the `k` classes with the most off-diagonal mass.
+    """
+    errors = cm.sum(axis=0) + cm.sum(axis=1) - 2 * np.diagonal(cm)
+    return np.argsort(errors, kind='stable')[::-1][:k]
+
+
 def plotgrid_dims(
         n_items) \
         -> 'Tuple[int, int]':
@@ -124,3 +253,96 @@ def fig_width(
         return round(max_width * 0.6)
     else:
         return max_width
+
+
+def draw_grid(
+        fig: Figure,
+        panels: list) \
+        -> None:
+    """
+    Draw `grid_panels` output into `fig`, one axes per panel.
+    """
+    nrows, ncols = plotgrid_dims(len(panels))
+    axes = fig.subplots(nrows, ncols, squeeze=False).ravel()
+    for ax, (name, counts, edges) in zip(axes, panels):
+        if isinstance(edges, np.ndarray):
+            ax.stairs(counts, edges, fill=True)
+        else:
+            pos = np.arange(len(counts))
+            ax.barh(pos, counts)
+            ax.set_yticks(pos, labels=edges)
+            ax.invert_yaxis()
+        ax.set_title(str(name))
+    for ax in axes[len(panels):]:
+        ax.set_axis_off()
+    # fixed spacing, layout engines dominate render time
+    fig.subplots_adjust(hspace=0.4, wspace=0.3)
+
+
+def grid_panels(
+        df: pd.DataFrame,
+        bins: int = 30,
+        max_levels: int = 20,
+        block_cols: int = 32) \
+        -> list:
+    """
+    `(name, counts, edges)` per column, in column order.
+
+    Numeric columns are binned `block_cols` at a time by `histograms`.
+    Other columns get value counts, with `edges` as a list of labels.
+    """
+    num = df.select_dtypes('number').columns
+    panels = {}
+    for i in range(0, len(num), block_cols):
+        cols = num[i:i + block_cols]
+        counts, edges = histograms(df[cols].to_numpy(float), bins)
+        panels.update(zip(cols, zip(cols, counts, edges)))
+    for col in df.columns.difference(num, sort=False):
+        counts = df[col].value_counts(dropna=False).head(max_levels)
+        labels = [str(x) for x in counts.index]
+        panels[col] = col, counts.to_numpy(), labels
+    return [panels[col] for col in df.columns]
+
+
+def histograms(
+        X: np.ndarray,
+        bins: int = 30) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-column histograms of 2d array with one `np.bincount`.
+
+    Returns `counts` of shape (n_cols, bins) and `edges` of shape
+    (n_cols, bins + 1). Non-finite values are not counted.
+    """
+    n_cols = X.shape[1]
+    finite = np.isfinite(X)
+    lo = np.where(finite, X, np.inf).min(axis=0, initial=np.inf)
+    hi = np.where(finite, X, -np.inf).max(axis=0, initial=-np.inf)
+
+    # empty and constant cols, same as `np.histogram`
+    empty = lo > hi
+    lo[empty], hi[empty] = 0, 1
+    const = lo == hi
+    lo[const] -= 0.5
+    hi[const] += 0.5
+
+    with np.errstate(invalid='ignore'):
+        idx = np.floor((X - lo) / (hi - lo) * bins)
+    idx = np.clip(idx[finite], 0, bins - 1).astype(np.intp)
+    idx += np.nonzero(finite)[1] * bins
+    counts = np.bincount(idx, minlength=n_cols * bins)
+
+    edges = lo[:, None] + (hi - lo)[:, None] * np.linspace(0, 1, bins + 1)
+    return counts.reshape(n_cols, bins), edges
+
+
+def save_fig(
+        args: tuple) \
+        -> None:
+    """
+    Render `(panels, path, dpi)` to `path` without `pyplot`.
+    """
+    panels, path, dpi = args
+    fig = Figure(figsize=fig_dims(len(panels)))
+    draw_grid(fig, panels)
+    fig.savefig(path, dpi=dpi)
@@ -4,25 +4,53 @@
 # Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
 
 
-from typing import Sequence
+import sys
+from typing import IO, Sequence
 
 import numpy as np
 
+ALIGN = {'<': np.char.ljust, '>': np.char.rjust, '^': np.char.center}
+
 
 def print_arr(
         arr: np.ndarray,
         sep: str=' '*2,
-        align: str=None) \
+        align: str=None,
+        file: IO=None,
+        max_rows: int=None,
+        block_rows: int=2**16,
+        precision: int=None) \
         -> None:
+    """
+    Print `arr` as an aligned table to `file` (default stdout).
+
+    Columns are converted to strings once per block of `block_rows`
+    rows and written as they are rendered. With `max_rows`, only the
+    first `max_rows - max_rows // 2` and last `max_rows // 2` rows are
+    shown, around a '...' row.
+    Floats are aligned at the decimal point, with `precision` digits
+    if given; see `format_floats`.
+    """
     # reshape row -> col
     if arr.ndim < 2:
         arr = arr.reshape(-1, 1)
+    if file is None:
+        file = sys.stdout
+
+    # head and tail elision
+    if max_rows is not None and arr.shape[0] > max_rows:
+        head, tail = max_rows - max_rows // 2, max_rows // 2
+        parts = [arr[:head], arr[arr.shape[0] - tail:]]
+    else:
+        parts = [arr]
 
-    # align and print floats
+    # align floats
     if np.issubdtype(arr.dtype, np.floating):
-        arr = np.apply_along_axis(split_align, 0, arr)
-        print(''.join([sep.join(row.astype('U')) + '\n' for row in arr]))
-        return
+        shown = np.concatenate(parts) if len(parts) > 1 else arr
+        shown = format_floats(shown, precision)
+        parts = np.split(shown, [len(parts[0])]) if len(parts) > 1 \
+            else [shown]
+        align = '<'
 
     # calculate alignment
     if align:
@@ -33,23 +61,94 @@ def print_arr(
         align = '<'
 
     # calculate col widths
-    col_width = []
-    for col in arr.T:
-        col_width += [max_len(col)]
+    col_width = [col_len(p[:, c] for p in parts) for c in range(arr.shape[1])]
 
     # print table
-    s = []
-    for r in range(arr.shape[0]):
-        for c in range(arr.shape[1]):
-            s += [f'{arr[r,c]:{align}{col_width[c]}}' + sep]
-        s += ['\n']
-    print(''.join(s))
+    for i, part in enumerate(parts):
+        if i:
+            file.write('...\n')
+        for r in range(0, part.shape[0], block_rows):
+            file.write(render_rows(
+                part[r:r + block_rows], col_width, align, sep))
 
 
 #
 # Helpers
 
 
+def col_len(
+        cols: Sequence[np.ndarray],
+        block_rows: int=2**16) \
+        -> int:
+    """
+    Max `str` width over 1d arrays, without converting where possible.
+    """
+    width = 0
+    for col in cols:
+        if col.size == 0:
+            continue
+        if col.dtype.kind in 'iu':
+            w = max(len(str(col.min())), len(str(col.max())))
+        elif col.dtype.kind in 'SU':
+            w = int(np.char.str_len(col).max())
+        elif col.dtype.kind == 'b':
+            w = 5 if not col.all() else 4
+        else:
+            w = max(int(np.char.str_len(col[i:i + block_rows].astype('U'))
+                        .max()) for i in range(0, len(col), block_rows))
+        width = max(width, w)
+    return width
+
+
+def format_block(
+        block: np.ndarray,
+        fmt: str) \
+        -> np.ndarray:
+    """
+    2d array %-formatted with `fmt` in one batched call.
+    """
+    if block.size == 0:
+        return block.astype('U')
+    text = ((fmt + '\n') * block.size) % tuple(block.ravel().tolist())
+    return np.array(text.split('\n')[:-1]).reshape(block.shape)
+
+
+def format_floats(
+        arr: np.ndarray,
+        precision: int=None,
+        sci: float=1e16) \
+        -> np.ndarray:
+    """
+    2d float array as strings, decimal aligned within each column.
+
+    Columns with a magnitude >= `sci` or a nonzero magnitude < 1e-4
+    fall back to scientific notation. Without `precision`, fixed
+    columns use the shortest repr and scientific columns 6 digits.
+    """
+    if arr.size == 0:
+        return arr.astype('U')
+    finite = np.isfinite(arr)
+    mag = np.abs(np.where(finite, arr, 0))
+    tiny = np.where(mag > 0, mag, np.inf).min(axis=0, initial=np.inf)
+    is_sci = (mag.max(axis=0, initial=0) >= sci) | (tiny < 1e-4)
+
+    groups = []
+    for cols, spec in ((~is_sci, 'f'), (is_sci, 'e')):
+        if not cols.any():
+            continue
+        block = arr[:, cols]
+        if spec == 'f' and precision is None:
+            groups += [(cols, shortest_repr(block))]
+        else:
+            p = 6 if precision is None else precision
+            groups += [(cols, format_block(block, f'%.{p}{spec}'))]
+
+    out = np.empty(arr.shape, dtype=np.result_type(*(g for _, g in groups)))
+    for cols, block in groups:
+        out[:, cols] = block
+    return split_align(out)
+
+
 def max_len(
         row: Sequence) \
         -> int:
@@ -59,29 +158,54 @@ def max_len(
     return max(len(str(x)) for x in row)
 
 
-def split_align(
-        row: Sequence,
-        sep: str='.') \
+def render_rows(
+        block: np.ndarray,
+        col_width: Sequence[int],
+        align: str,
+        sep: str) \
+        -> str:
+    """
+    2d array as padded, `sep`-joined, newline-terminated rows.
+    """
+    pad = ALIGN[align]
+    cells = np.stack(
+        [pad(block[:, c].astype('U'), w) for c, w in enumerate(col_width)],
+        axis=1)
+    return '\n'.join(map(sep.join, cells.tolist())) + '\n'
+
+
+def shortest_repr(
+        block: np.ndarray) \
         -> np.ndarray:
     """
-    Align 1d array at `sep`.
+    Float array as shortest round-trip strings.
     """
-    split = np.char.partition(row.astype('U'), sep)
+    # python repr beats astype('U'), but only matches it for float64
+    if block.dtype != np.float64:
+        return block.astype('U')
+    text = list(map(repr, block.ravel().tolist()))
+    return np.array(text).reshape(block.shape)
 
-    left = split[:, 0]
-    mid = split[:, 1]
-    right = split[:, 2]
 
-    w_left = max_len(left)
-    w_right = max_len(right)
+def split_align(
+        arr: np.ndarray,
+        sep: str='.') \
+        -> np.ndarray:
+    """
+    Align 1d array, or each column of 2d array, at `sep`.
 
-    align = np.char.add(
-        np.char.rjust(left, w_left),
-        mid
-    )
-    align = np.char.add(
-        align,
-        np.char.ljust(right, w_right)
-    )
+    Values without `sep` (nan, inf) end where `sep` would be.
+    """
+    arr = np.asarray(arr)
+    if arr.dtype.kind not in 'SU':
+        arr = arr.astype('U')
+    n = np.char.str_len(arr)
+    pos = np.char.find(arr, sep)
+    pos = np.where(pos < 0, n, pos)
+
+    # shift `sep` to the column's widest left part, then pad right
+    shift = pos.max(axis=0) - pos
+    align = np.char.add(np.char.multiply(' ', shift), arr)
+    align = np.char.ljust(align, (n + shift).max(axis=0))
 
     return align
@@ -0,0 +1,249 @@
+# Released under CC0.
+# Summary: https://creativecommons.org/publicdomain/zero/1.0/
+# Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
+
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyscripts.henshin import (CachedTransform, DataFrameUnion, FillNA,
+                               GetDummies, NADummies, PdStandardScaler,
+                               PdTransform,
+                               SelectColumns, SelectDtypes, fit_chunks,
+                               hstack, transform_chunks)
+
+
+def test_cached_transform():
+    X = pd.DataFrame({'a': [1.0, 2.0, 3.0], 'b': [4.0, 5.0, 7.0]})
+
+    # unpicklable member: keyed by identity, refit must still invalidate
+    union = DataFrameUnion([PdTransform(lambda d: d * 2), PdStandardScaler()])
+    ct = CachedTransform(union).fit(X)
+    ct.transform(X)
+    ct.transform(X)
+    assert (ct.hits, ct.misses) == (1, 1)
+    ct.fit(X * 10)
+    pd.testing.assert_frame_equal(ct.transform(X), union.transform(X))
+    assert ct.misses == 2
+
+    with pytest.raises(ValueError):
+        CachedTransform(FillNA('a', 0, inplace=True))
+
+
+def test_cached_transform_disk(tmp_path):
+    X = pd.DataFrame({'a': [1.0, 2.0, 3.0]})
+    (tmp_path / 'notes.txt').write_text('keep')
+    ct = CachedTransform(
+        PdStandardScaler(), cache_dir=str(tmp_path), max_bytes=1).fit(X)
+    ct.transform(X)
+    ct.transform(X * 2)
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) == 2 and 'notes.txt' in names
+
+    ct.clear()
+    assert os.listdir(tmp_path) == ['notes.txt']
+
+
+def union_frame():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'a': rng.normal(size=50),
+        'b': rng.normal(size=50),
+        'i': rng.integers(0, 5, 50),
+        'c': rng.choice(['x', 'y'], 50)
+    })
+
+
+@pytest.mark.parametrize('backend', ['thread', 'process'])
+def test_data_frame_union(backend):
+    X = union_frame()
+    cases = [
+        # one float block: hstack
+        (X[['a', 'b']],
+         [SelectColumns(['a']), PdStandardScaler(), SelectColumns(['b'])]),
+        # mixed dtypes: concat
+        (X,
+         [SelectDtypes('number'), GetDummies(['c']), SelectColumns(['i'])])
+    ]
+    for X, trf_list in cases:
+        serial = DataFrameUnion(trf_list).fit(X)
+        pooled = DataFrameUnion(
+            trf_list, n_jobs=2, backend=backend).fit(X)
+        pd.testing.assert_frame_equal(
+            pooled.transform(X), serial.transform(X))
+
+
+def test_hstack():
+    X = union_frame()
+    frames = [X[['a']], X['b'], X[['a', 'b']] * 2]
+    out = hstack(frames)
+    pd.testing.assert_frame_equal(out, pd.concat(frames, axis=1))
+    assert len(out._mgr.blocks) == 1
+
+    # mixed dtypes fall back to concat
+    frames = [X[['a']], X[['i', 'c']]]
+    pd.testing.assert_frame_equal(hstack(frames), pd.concat(frames, axis=1))
+
+
+def na_frame():
+    return pd.DataFrame({
+        'a': [np.nan, 1.0, 3.0, np.nan],
+        'b': [2.0, np.nan, 2.0, 6.0],
+        's': ['x', None, 'x', 'y']
+    })
+
+
+def test_fill_na():
+    X = na_frame()
+    out = FillNA('a', 0).transform(X)
+    assert out['a'].tolist() == [0, 1, 3, 0]
+    assert out['b'].isna().sum() == 1
+
+    out = FillNA(None, {'a': -1, 's': 'z'}).transform(X)
+    assert out['a'].tolist() == [-1, 1, 3, -1]
+    assert out['s'].tolist() == ['x', 'z', 'x', 'y']
+
+    out = FillNA(['a', 'b'], 5).transform(X)
+    assert out[['a', 'b']].notna().all().all()
+
+    # col=None: mean / median over numeric columns only
+    out = FillNA(None, 'mean').fit(X).transform(X)
+    assert out['a'].tolist() == [2, 1, 3, 2]
+    assert np.isclose(out.loc[1, 'b'], 10 / 3)
+    assert out['s'].isna().sum() == 1
+    out = FillNA(None, 'median').fit(X).transform(X)
+    assert out['b'].tolist() == [2, 2, 2, 6]
+
+    out = FillNA(['s'], 'mode').fit(X).transform(X)
+    assert out['s'].tolist() == ['x', 'x', 'x', 'y']
+
+
+def test_fill_na_partial_fit():
+    X = na_frame()
+    trf = FillNA(None, 'mean').fit(X.iloc[:2])
+    trf.partial_fit(X.iloc[2:])
+    assert trf.fill == FillNA(None, 'mean').fit(X).fill
+
+    with pytest.raises(ValueError):
+        FillNA('a', 'median').fit(X).partial_fit(X)
+
+
+def test_fill_na_inplace():
+    X = na_frame()
+    FillNA('a', 0).transform(X)
+    assert X['a'].isna().sum() == 2
+
+    out = FillNA('a', 0, inplace=True).transform(X)
+    assert out is X
+    assert X['a'].tolist() == [0, 1, 3, 0]
+
+
+def test_na_dummies():
+    X = na_frame()
+    out = NADummies(['a', 's']).transform(X)
+    assert list(out.columns) == ['a_na', 's_na']
+    assert (out.dtypes == np.uint8).all()
+    assert out.to_numpy().tolist() == [[1, 0], [0, 1], [0, 0], [1, 0]]
+    out = NADummies('b').transform(X)
+    assert out.name == 'b_na'
+    assert out.tolist() == [0, 1, 0, 0]
+
+
+def test_get_dummies():
+    X = pd.DataFrame({
+        'x': [1.0, 2.0, 3.0, 4.0],
+        'c': ['b', 'a', None, 'b'],
+        'd': pd.Categorical(['u', 'v', 'u', 'v'])
+    })
+    expected = pd.get_dummies(X, dtype=np.uint8)
+    out = GetDummies().fit(X).transform(X)
+    pd.testing.assert_frame_equal(out, expected)
+
+    expected = pd.get_dummies(X, drop_first=True, dtype=np.uint8)
+    out = GetDummies(drop_first=True).fit(X).transform(X)
+    pd.testing.assert_frame_equal(out, expected)
+
+    # unfitted: categories from the batch
+    pd.testing.assert_frame_equal(
+        GetDummies().transform(X), pd.get_dummies(X, dtype=np.uint8))
+
+
+def test_get_dummies_frozen():
+    trf = GetDummies().fit(pd.DataFrame({'c': ['a', 'b']}))
+    out = trf.transform(pd.DataFrame({'c': ['b', 'z']}))
+    assert list(out.columns) == ['c_a', 'c_b']
+    assert out.to_numpy().tolist() == [[0, 1], [0, 0]]
+
+    trf.handle_unknown = 'error'
+    with pytest.raises(ValueError):
+        trf.transform(pd.DataFrame({'c': ['b', 'z']}))
+
+
+def test_get_dummies_sparse():
+    X = pd.DataFrame({'x': [1.0, 2.0, 3.0], 'c': ['b', 'a', 'b']})
+    dense = GetDummies().fit(X).transform(X)
+    scipy_out = GetDummies(sparse='scipy').fit(X).transform(X)
+    assert np.array_equal(scipy_out.toarray(), dense.to_numpy(float))
+    pandas_out = GetDummies(sparse='pandas').fit(X).transform(X)
+    assert list(pandas_out.columns) == list(dense.columns)
+    assert np.array_equal(pandas_out.to_numpy(float), dense.to_numpy(float))
+
+
+def test_pd_standard_scaler_merge():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(3, 2, (1000, 3)), columns=list('abc'))
+    X.iloc[:10, 2] = np.nan
+    full = PdStandardScaler().fit(X)
+
+    shards = [X.iloc[:100], X.iloc[100:550], X.iloc[550:]]
+    merged = PdStandardScaler().fit(shards[0])
+    for shard in shards[1:]:
+        merged.merge(PdStandardScaler().fit(shard))
+    partial = PdStandardScaler()
+    for shard in shards:
+        partial.partial_fit(shard)
+
+    for s in (merged, partial):
+        assert np.allclose(s.mean, X.mean())
+        assert np.allclose(s.std, X.std(ddof=0))
+        assert np.allclose(s.mean, full.mean)
+        assert np.allclose(s.std, full.std)
+
+
+def test_pd_standard_scaler_transform():
+    X = pd.DataFrame({
+        'a': np.array([1, 2, 3, 4], np.float32),
+        'b': np.array([5, 5, 5, 5], np.float32)
+    })
+    out = PdStandardScaler().fit(X).transform(X)
+    assert (out.dtypes == np.float32).all()
+    assert np.allclose(out['a'], (X['a'] - 2.5) / X['a'].std(ddof=0))
+    assert np.allclose(out['b'], 0)
+
+    arr = X.to_numpy().copy()
+    out = PdStandardScaler(copy=False).fit(X).transform(arr)
+    assert np.shares_memory(out, arr)
+
+
+def test_chunks():
+    X = pd.DataFrame({
+        'x': [1.0, np.nan, 3.0, 4.0, np.nan, 8.0, 2.0],
+        'c': ['a', 'a', 'b', 'a', 'c', 'b', 'b'],
+        'k': ['u', None, 'v', 'v', 'v', None, 'u']
+    })
+    chunks = [X.iloc[i:i + 3] for i in range(0, len(X), 3)]
+    cases = [
+        (GetDummies(['c']), GetDummies(['c'])),
+        (FillNA('x', 'mean'), FillNA('x', 'mean')),
+        (FillNA(['k'], 'mode'), FillNA(['k'], 'mode'))
+    ]
+    for chunked, whole in cases:
+        fit_chunks(chunked, iter(chunks))
+        whole.fit(X)
+        expected = whole.transform(X)
+        out = list(transform_chunks(chunked, chunks))
+        assert all(list(o.columns) == list(expected.columns) for o in out)
+        pd.testing.assert_frame_equal(pd.concat(out), expected)
@@ -0,0 +1,47 @@
+# Released under CC0.
+# Summary: https://creativecommons.org/publicdomain/zero/1.0/
+# Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
+
+
+import numpy as np
+import pandas as pd
+
+from pyscripts.kaggle import profile, reorder
+
+
+def frame(n=60):
+    rng = np.random.default_rng(0)
+    f = rng.integers(0, 7, n).astype(float)
+    f[::5] = np.nan
+    return pd.DataFrame({
+        'i': rng.integers(-3, 3, n),
+        'f': f,
+        'c': pd.Categorical(rng.choice(['x', 'yy', 'zzz'], n)),
+        'o': np.array(rng.choice(['a', 'b', None], n), dtype=object),
+        'b': rng.integers(0, 2, n).astype(bool),
+        't': pd.to_datetime(rng.integers(0, 4, n), unit='D')
+    })
+
+
+def test_profile():
+    df = frame()
+    out = profile(df)
+    assert list(out.index) == list(reorder(df).columns) + ['b', 't']
+    assert list(out['group']) == [0, 1, 2, 3, 4, 4]
+    for col in df:
+        s = df[col]
+        assert out.loc[col, 'na'] == s.isna().sum()
+        assert out.loc[col, 'nunique'] == s.nunique()
+        assert out.loc[col, 'memory'] == s.memory_usage(deep=True,
+                                                        index=False)
+    assert out.loc['f', 'na_perc'] == 20.0
+    assert (out.loc['f', 'min'], out.loc['f', 'max']) == \
+        (df['f'].min(), df['f'].max())
+    assert out.loc['c', 'dtype'] == 'category'
+
+
+def test_profile_chunked():
+    df = frame()
+    chunks = [df.iloc[i:i + 7] for i in range(0, len(df), 7)]
+    pd.testing.assert_frame_equal(profile(iter(chunks)), profile(df))
+    assert len(profile([df.iloc[:0]])) == 0
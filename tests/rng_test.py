@@ -0,0 +1,184 @@
+# Released under CC0.
+# Summary: https://creativecommons.org/publicdomain/zero/1.0/
+# Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
+
+
+from collections import Counter
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from pyscripts import rng
+from pyscripts.rng import (bootstrap, bootstrap_reduce, r_onehot, r_strings,
+                           r_text, roll, roll_dist, seed, shuffle)
+
+
+def mean_reducer(batch):
+    return batch.mean(axis=1)
+
+
+def brute(terms, const=0):
+    """
+    Exact pmf by enumerating every face combination of
+    `(sign, n, sides, keep, k)` terms.
+    """
+    faces = [d for sign, n, sides, keep, k in terms
+             for d in [range(1, sides + 1)] * n]
+    counts = Counter()
+    for combo in product(*faces):
+        total, i = const, 0
+        for sign, n, sides, keep, k in terms:
+            kept = sorted(combo[i:i + n])
+            i += n
+            if keep == 'h':
+                kept = kept[n - k:]
+            elif keep == 'l':
+                kept = kept[:k]
+            total += sign * sum(kept)
+        counts[total] += 1
+    n_combos = sum(counts.values())
+    return {x: c / n_combos for x, c in counts.items()}
+
+
+def assert_dist(expr, terms, const=0):
+    pmf = roll_dist(expr)
+    expected = brute(terms, const)
+    assert sorted(pmf.index) == sorted(expected)
+    assert np.allclose([pmf[x] for x in expected], list(expected.values()))
+
+
+def test_roll_dist():
+    assert_dist('4d6kh3', [(1, 4, 6, 'h', 3)])
+    assert_dist('2d6kl1+3-1d4', [(1, 2, 6, 'l', 1), (-1, 1, 4, None, 0)], 3)
+    assert_dist('3d4kl2+2d3kh1', [(1, 3, 4, 'l', 2), (1, 2, 3, 'h', 1)])
+    assert_dist('d20', [(1, 1, 20, None, 0)])
+    assert np.isclose(roll_dist('3d6+d8-2').sum(), 1)
+
+
+def test_roll():
+    rng.seed(0)
+    x = roll('4d6kh3+2', 10_000)
+    assert x.shape == (10_000,)
+    assert x.min() >= 5 and x.max() <= 20
+    assert set(np.unique(x)) <= set(roll_dist('4d6kh3+2').index)
+
+    rng.seed(1)
+    a = roll('2d8-1', 100)
+    rng.seed(1)
+    assert np.array_equal(a, roll('2d8-1', 100))
+
+
+def test_seed():
+    seed(42)
+    a = rng.RNG.random(5)
+    seed(42)
+    assert np.array_equal(a, rng.RNG.random(5))
+    seed(43)
+    assert not np.array_equal(a, rng.RNG.random(5))
+
+
+def test_bootstrap():
+    arr = np.arange(10) * 10
+    seed(0)
+    out = bootstrap(arr, n_samples=4, size=6)
+    assert out.shape == (4, 6)
+    assert set(out.ravel()) <= set(arr)
+
+    seed(0)
+    idx = bootstrap(arr, n_samples=4, size=6, return_index=True)
+    assert np.array_equal(arr[idx], out)
+
+    mat = np.arange(12).reshape(3, 4)
+    out = bootstrap(mat, n_samples=2, axis=1)
+    assert out.shape == (3, 2, 4)
+    assert (out % 4 == out[0] % 4).all()
+
+
+def test_shuffle():
+    arr = np.arange(20)
+    seed(0)
+    out = shuffle(arr)
+    assert sorted(out) == list(range(20))
+    assert np.array_equal(arr, np.arange(20))
+
+    out = shuffle(arr, size=5)
+    assert len(set(out)) == 5
+
+    mat = np.arange(12).reshape(4, 3)
+    out = shuffle(mat, inplace=True)
+    assert out is mat
+    assert sorted(mat[:, 0]) == [0, 3, 6, 9]
+    assert (mat[:, 1] == mat[:, 0] + 1).all()
+
+    with pytest.raises(ValueError):
+        shuffle(arr, size=5, inplace=True)
+
+
+def test_r_onehot():
+    seed(0)
+    dense = r_onehot(100, 4, p=[0.1, 0.2, 0.3, 0.4])
+    assert dense.shape == (100, 4) and dense.dtype == np.uint8
+    assert (dense.sum(axis=1) == 1).all()
+
+    seed(0)
+    sp = r_onehot(100, 4, p=[0.1, 0.2, 0.3, 0.4], sparse_output=True)
+    assert sparse.issparse(sp)
+    assert np.array_equal(sp.toarray(), dense)
+
+
+def test_bootstrap_reduce():
+    arr = np.random.default_rng(0).normal(size=200)
+    seed(7)
+    serial = bootstrap_reduce(arr, mean_reducer, 250, batch_size=64)
+    seed(7)
+    pooled = bootstrap_reduce(
+        arr, mean_reducer, 250, batch_size=64, n_jobs=2)
+    assert serial.shape == (250,)
+    assert np.array_equal(serial, pooled)
+    assert abs(serial.mean() - arr.mean()) < 0.1
+
+
+def test_r_strings():
+    seed(0)
+    out = r_strings(1000, 5, alphabet='ab')
+    assert out.dtype == np.dtype('U5')
+    assert set(''.join(out)) <= set('ab')
+    assert (np.char.str_len(out) == 5).all()
+
+    out = r_strings(1000, (2, 4), fmt='id-{}!')
+    lens = np.char.str_len(out)
+    assert lens.min() == 6 and lens.max() == 8
+    assert all(x.startswith('id-') and x.endswith('!') for x in out)
+
+    seed(1)
+    a = r_strings(10, (2, 4), output='S')
+    seed(1)
+    assert np.array_equal(a, r_strings(10, (2, 4), output='S'))
+    assert a.dtype.kind == 'S'
+
+    assert r_strings(10, output='string').dtype == 'string'
+    assert isinstance(r_strings(10, output='category'), pd.Categorical)
+
+
+def test_r_text():
+    words = ['ab', 'cde', 'f']
+    seed(0)
+    out = r_text(500, words, n_words=2, sep='_', fmt='<{}>')
+    for x in out:
+        assert x[0] == '<' and x[-1] == '>'
+        assert all(w in words for w in x[1:-1].split('_'))
+        assert len(x[1:-1].split('_')) == 2
+
+    out = r_text(500, words, output='category')
+    assert isinstance(out, pd.Categorical)
+    assert list(out.categories) == words
+    assert set(out) == set(words)
+
+    for output, kind in (('U', 'U'), ('S', 'S')):
+        assert r_text(5, words, n_words=3, output=output).dtype.kind == kind
+    assert r_text(5, words, n_words=3, output='string').dtype == 'string'
+    assert isinstance(
+        r_text(5, words, n_words=3, output='category'), pd.Categorical)
@@ -0,0 +1,242 @@
+# Released under CC0.
+# Summary: https://creativecommons.org/publicdomain/zero/1.0/
+# Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
+
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyscripts import scholar
+from pyscripts.scholar import (index_dir, iter_lines, read, read_file,
+                               read_many, scan_dir, split_file, write,
+                               write_arr)
+
+TEXT = ('alpha 1\n\nbeta 22\r\ngamma, a much longer line 333\n'
+        'déjà vu 4\nlast line without newline 5')
+
+
+def text_file(tmp_path, text=TEXT):
+    path = tmp_path / 'lines.txt'
+    path.write_bytes(text.encode('utf-8'))
+    return str(path)
+
+
+def frame():
+    return pd.DataFrame({
+        'f': np.array([1.5, np.nan, -2.25], np.float32),
+        'i': np.array([1, 2, 3], np.int64),
+        'b': [True, False, True],
+        's': ['a', None, 'ccc'],
+        'c': pd.Categorical(['x', 'y', 'x']),
+        't': pd.to_datetime(['2020-01-01', None, '2021-06-30'])
+    }, index=pd.Index([10, 20, 30], name='id'))
+
+
+def test_columns_roundtrip(tmp_path):
+    df = frame()
+    write(df, str(tmp_path / 'df'), fmt='columns')
+    for mmap_mode in ('c', None):
+        pd.testing.assert_frame_equal(
+            read(str(tmp_path / 'df'), mmap_mode=mmap_mode), df)
+    out = read(str(tmp_path / 'df'), columns=['i', 'c'])
+    pd.testing.assert_frame_equal(out, df[['i', 'c']])
+
+
+def test_columns_compressed(tmp_path):
+    df = frame()
+    write(df, str(tmp_path / 'df'), fmt='columns',
+          compress={'f': 'gzip', 's': 'bz2', 'c': 'lzma'})
+    pd.testing.assert_frame_equal(read(str(tmp_path / 'df')), df)
+
+    with open(tmp_path / 'df' / 'manifest.json') as file:
+        entries = json.load(file)['columns']
+    assert [e['compress'] for e in entries] == \
+        ['gzip', None, None, 'bz2', 'lzma', None]
+    assert entries[3]['file'] == 'c3.pkl.bz2'
+
+
+def test_columns_index(tmp_path):
+    df = frame().set_index(pd.CategoricalIndex(['x', 'y', 'x'], name='k'))
+    write(df, str(tmp_path / 'df'), fmt='columns', compress='gzip')
+    out = read(str(tmp_path / 'df'))
+    assert isinstance(out.index, pd.CategoricalIndex)
+    pd.testing.assert_frame_equal(out, df)
+
+    s = pd.Series([1, 2], index=pd.Index(['a', 'b'], name='k'))
+    write(s, str(tmp_path / 's'), fmt='columns')
+    pd.testing.assert_series_equal(read(str(tmp_path / 's')), s)
+
+
+def test_columns_ndarray_series(tmp_path):
+    arr = np.arange(12, dtype=np.int32).reshape(4, 3)
+    write(arr, str(tmp_path / 'arr'), fmt='columns')
+    assert np.array_equal(np.asarray(read(str(tmp_path / 'arr'))), arr)
+
+    s = pd.Series([1.0, 2.0], name='v')
+    write(s, str(tmp_path / 's'), fmt='columns')
+    pd.testing.assert_series_equal(read(str(tmp_path / 's')), s)
+
+
+def test_read_many():
+    def reader(p):
+        if p == 3:
+            raise OSError(p)
+        return p * 2
+
+    out = list(read_many(range(20), reader=reader, n_jobs=2, window=3))
+    assert [p for p, _, _ in out] == list(range(20))
+    assert [d for p, d, _ in out if p != 3] == \
+        [p * 2 for p in range(20) if p != 3]
+    assert isinstance(out[3][2], OSError)
+
+    out = read_many(range(20), reader=reader, ordered=False, window=3)
+    assert sorted(p for p, _, _ in out) == list(range(20))
+
+    # stopping early leaves the rest unread
+    started = []
+    for p, _, _ in read_many(range(1000), reader=started.append, n_jobs=2):
+        break
+    assert len(started) <= 8
+
+
+def test_write_arr(tmp_path):
+    path = str(tmp_path / 'arr.txt')
+    arr = np.array([[1.5, 2.0], [-3.25, 1e-7]])
+    write_arr(arr, path, chunk_rows=1)
+    assert np.array_equal(np.loadtxt(path), arr)
+
+    write_arr(np.array([[1, 2], [3, 4]]), path, sep='%')
+    assert open(path).read() == '1%2\n3%4\n'
+
+    write_arr(np.array([[1, 2]]), path, fmt=['%03d', '%x'], sep=',')
+    assert open(path).read() == '001,2\n'
+
+    with pytest.raises(ValueError):
+        write_arr(np.array([[1, 2]]), path, fmt=['%d'])
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 16, 2**22])
+def test_iter_lines(tmp_path, block_size):
+    path = text_file(tmp_path)
+    expected = read_file(path)
+    assert len(expected) == 6
+
+    assert list(iter_lines(path, block_size=block_size)) == expected
+    assert list(iter_lines(path, line_filter=r'\d{2}',
+                           block_size=block_size)) == \
+        [x for x in expected if re.search(r'\d{2}', x)]
+
+    out = np.concatenate(list(
+        iter_lines(path, output='U', block_size=block_size)))
+    assert out.tolist() == expected
+    out = np.concatenate(list(
+        iter_lines(path, output='S', block_size=block_size)))
+    assert [x.decode('utf-8') for x in out] == expected
+
+    lines = []
+    for buf, offsets in iter_lines(
+            path, output='offsets', block_size=block_size):
+        lines += [buf[a:b].tobytes().decode('utf-8')
+                  for a, b in zip(offsets[:-1], offsets[1:])]
+    assert lines == expected
+
+
+def test_iter_lines_edges(tmp_path):
+    assert list(iter_lines(text_file(tmp_path, ''))) == []
+    path = text_file(tmp_path, 'a\r\nb\r\n')
+    assert list(iter_lines(path, block_size=2)) == ['a', 'b']
+    assert list(iter_lines(path, line_filter='b')) == ['b']
+    with pytest.raises(ValueError):
+        list(iter_lines(path, output='x'))
+
+
+def test_split_file(tmp_path):
+    path = text_file(tmp_path, '')
+    assert split_file(path).shape == (0,)
+    assert split_file(path, as_bytes=True).dtype == np.dtype('S1')
+
+    # no line breaks, whole chunks: view of the mapping
+    path = text_file(tmp_path, 'abcdef')
+    out = split_file(path, chunk_size=2, as_bytes=True)
+    assert out.tolist() == [b'ab', b'cd', b'ef']
+    assert not out.flags.writeable
+    assert split_file(path, chunk_size=3).tolist() == ['abc', 'def']
+
+    # CRLF dropped, trailing partial chunk padded
+    path = text_file(tmp_path, 'abc\r\nde\nfgh\r\n')
+    assert split_file(path).tolist() == list('abcdefgh')
+    assert split_file(path, chunk_size=3).tolist() == ['abc', 'def', 'gh']
+    assert split_file(path, chunk_size=3, as_bytes=True, block_size=4) \
+        .tolist() == [b'abc', b'def', b'gh']
+
+    # non-ascii: decoded, chunked by character
+    path = text_file(tmp_path, 'déjà\nvu!')
+    assert split_file(path, chunk_size=2).tolist() == ['dé', 'jà', 'vu', '!']
+    assert split_file(path, block_size=2).tolist() == list('déjàvu!')
+    assert b''.join(split_file(path, as_bytes=True).tolist()) == \
+        'déjàvu!'.encode('utf-8')
+
+    # encodings whose newline isn't one byte
+    (tmp_path / 'u16.txt').write_bytes('ab\ncd'.encode('utf-16'))
+    assert split_file(str(tmp_path / 'u16.txt'), encoding='utf-16',
+                      chunk_size=2).tolist() == ['ab', 'cd']
+
+
+def tree(tmp_path):
+    root = tmp_path / 'root'
+    for name in ['a.txt', 'b.csv', 'sub/c.txt', 'sub/deep/e.txt',
+                 'skip/d.txt']:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(name)
+    return str(root)
+
+
+def test_index_dir(tmp_path):
+    root = tree(tmp_path)
+    assert index_dir(root) == sorted(scan_dir(root))
+
+    def names(paths):
+        return [os.path.relpath(p, root) for p in paths]
+
+    assert names(index_dir(root, file_filter='*.txt', folder_filter='s*b')) \
+        == ['a.txt', 'sub/c.txt']
+    assert names(index_dir(root, file_filter=re.compile(r'^[ab]\.'))) \
+        == ['a.txt', 'b.csv']
+    assert names(index_dir(root, folder_filter=lambda x: x != 'deep',
+                           file_filter=lambda x: x.endswith('txt'))) \
+        == ['a.txt', 'skip/d.txt', 'sub/c.txt']
+    assert names(index_dir(root, recursive=False)) == ['a.txt', 'b.csv']
+
+    path, size, mtime = index_dir(root, with_stat=True)[0]
+    assert names([path]) == ['a.txt']
+    assert size == len('a.txt')
+    assert mtime == os.stat(path).st_mtime
+
+
+def test_index_dir_cache(tmp_path, monkeypatch):
+    root = tree(tmp_path)
+    index_path = str(tmp_path / 'index.pkl')
+    expected = index_dir(root, index_path=index_path)
+
+    listed = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        listed.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(scholar.os, 'scandir', counting_scandir)
+    assert index_dir(root, index_path=index_path) == expected
+    assert listed == []
+
+    # new file bumps the directory mtime: only that directory is re-listed
+    (tmp_path / 'root' / 'sub' / 'new.txt').write_text('new')
+    os.utime(tmp_path / 'root' / 'sub', ns=(1, 1))
+    out = index_dir(root, index_path=index_path)
+    assert os.path.join(root, 'sub', 'new.txt') in out
+    assert listed == [os.path.join(root, 'sub')]
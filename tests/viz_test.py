@@ -0,0 +1,64 @@
+# Released under CC0.
+# Summary: https://creativecommons.org/publicdomain/zero/1.0/
+# Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
+
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from matplotlib import pyplot as plt
+from sklearn.metrics import confusion_matrix
+
+from pyscripts.viz import confmat, histograms, most_confused, plot_confmat
+
+matplotlib.use('Agg')
+
+
+def test_confmat():
+    rng = np.random.default_rng(0)
+    y = pd.Series(rng.choice(['b', 'a', 'c'], 1000))
+    y_hat = rng.choice(['b', 'a', 'c', 'd'], 1000)
+
+    cm, labels = confmat(y, y_hat, chunk_size=77)
+    assert list(labels) == ['a', 'b', 'c', 'd']
+    assert np.array_equal(cm, confusion_matrix(y, y_hat, labels=labels))
+
+    for normalize in ('true', 'pred', 'all'):
+        assert np.allclose(
+            confmat(y, y_hat, normalize=normalize)[0],
+            confusion_matrix(y, y_hat, labels=labels, normalize=normalize))
+
+    # pairs outside `labels` are dropped, as in sklearn
+    cm, labels = confmat(y, y_hat, labels=['c', 'a'])
+    assert np.array_equal(cm, confusion_matrix(y, y_hat, labels=['c', 'a']))
+
+
+def test_most_confused():
+    cm = np.array([
+        [9, 0, 0],
+        [0, 5, 4],
+        [1, 3, 2]
+    ])
+    assert list(most_confused(cm, 2)) == [2, 1]
+
+
+def test_plot_confmat():
+    y = pd.Series([3, 1, 2, 2, 1])
+    plot_confmat(y, [3, 1, 1, 2, 2])
+    ax = plt.gca()
+    assert [t.get_text() for t in ax.get_xticklabels()] == ['1', '2', '3']
+    plt.close('all')
+
+
+def test_histograms():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 3))
+    X[0, 1] = np.nan
+    X[1, 0] = np.inf
+    X[:, 2] = 3
+    counts, edges = histograms(X, 10)
+    for j in range(3):
+        x = X[:, j][np.isfinite(X[:, j])]
+        expected, expected_edges = np.histogram(x, 10)
+        assert np.array_equal(counts[j], expected)
+        assert np.allclose(edges[j], expected_edges)
@@ -0,0 +1,87 @@
+# Released under CC0.
+# Summary: https://creativecommons.org/publicdomain/zero/1.0/
+# Legal Code: https://creativecommons.org/publicdomain/zero/1.0/legalcode.txt
+
+
+import io
+
+import numpy as np
+import pytest
+
+from pyscripts.woodcut import print_arr, split_align
+
+
+def show(arr, **kwargs):
+    file = io.StringIO()
+    print_arr(arr, file=file, **kwargs)
+    return file.getvalue()
+
+
+def test_print_arr_widths():
+    assert show(np.array([[1, -20], [300, 4]])) == \
+        '  1  -20\n300    4\n'
+    assert show(np.array([['a', 'bbb'], ['cc', 'd']])) == \
+        'a   bbb\ncc  d  \n'
+    assert show(np.array([1, 'xyz', None], dtype=object)) == \
+        '1   \nxyz \nNone\n'
+    assert show(np.array([True, False])) == 'True \nFalse\n'
+    assert show(np.array([[1, 2]]), sep='|', align='^') == '1|2\n'
+
+
+def baseline_split_align(row, sep='.'):
+    """
+    `split_align` before 2d support, kept as reference.
+    """
+    split = np.char.partition(row.astype('U'), sep)
+    w_left = max(len(x) for x in split[:, 0])
+    w_right = max(len(x) for x in split[:, 2])
+    return np.char.add(np.char.add(np.char.rjust(split[:, 0], w_left),
+                                   split[:, 1]),
+                       np.char.ljust(split[:, 2], w_right))
+
+
+FLOATS = np.array([[1.5, np.nan], [-10.25, np.inf], [3.0, 1e-7]])
+
+
+def test_print_arr_floats():
+    assert show(FLOATS).splitlines() == [
+        '  1.5   nan           ',
+        '-10.25  inf           ',
+        '  3.0     1.000000e-07']
+    assert show(FLOATS, precision=2).splitlines() == [
+        '  1.50  nan       ',
+        '-10.25  inf       ',
+        '  3.00    1.00e-07']
+    assert show(FLOATS[:, 0], precision=0) == '  2\n-10\n  3\n'
+    assert show(FLOATS.astype(np.float32)[:, :1]) == show(FLOATS[:, :1])
+
+
+def test_split_align():
+    row = np.array([1.5, -10.25, 3.0, 100.125, 0.0])
+    assert np.array_equal(split_align(row), baseline_split_align(row))
+    words = np.array(['a.b', 'ccc.', '.dd'])
+    assert np.array_equal(split_align(words), baseline_split_align(words))
+
+    # values without `sep` end where it would be, padded to full width
+    assert split_align(np.array(['1.5', 'nan'])).tolist() == \
+        ['  1.5', 'nan  ']
+    assert np.array_equal(split_align(FLOATS.astype('U'))[:, 0],
+                          split_align(FLOATS[:, 0]))
+
+
+def test_print_arr_file(capsys):
+    arr = np.arange(6).reshape(3, 2)
+    print_arr(arr)
+    assert capsys.readouterr().out == show(arr) == '0  1\n2  3\n4  5\n'
+    assert show(arr, block_rows=1) == show(arr)
+
+
+@pytest.mark.parametrize('max_rows, head, tail', [
+    (1, 1, 0), (2, 1, 1), (3, 2, 1), (4, 2, 2), (10, 10, 0)])
+def test_print_arr_elision(max_rows, head, tail):
+    arr = np.arange(5) * 100
+    out = [line.strip() for line in show(arr, max_rows=max_rows).split('\n')]
+    shown = [str(x) for x in arr]
+    if head + tail < len(arr):
+        shown = shown[:head] + ['...'] + shown[len(arr) - tail:]
+    assert out == shown + ['']